@@ -0,0 +1,93 @@
+"""
+JWT authentication without a database query per request.
+
+JWTAuthentication loads the user row for every request. CachedJWTAuthentication
+caches the few user fields requests need, per token subject, and builds the
+user from them. The other fields are deferred: they are loaded from the
+database only if accessed, and save() only writes the loaded fields, so a
+cached user can't overwrite fields it doesn't hold.
+
+Saving or deleting a user drops their cache entry (see account.signals);
+USER_CACHE_TIMEOUT bounds how long changes made without signals (e.g.
+QuerySet.update()) take to apply. That only reaches every worker through a
+shared cache, so users are only cached with the JWT_USER_CACHE setting
+(on by default with Redis); without it, the user is loaded as usual.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+User = get_user_model()
+
+# Seconds a user's authentication fields stay cached.
+USER_CACHE_TIMEOUT = 60
+
+USER_CACHE_FIELDS = ("id", "username", "email", "is_active")
+
+
+def user_cache_key(user_id):
+    return f"account:jwt-user:{user_id}"
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication with the user fields cached per token subject.
+    """
+
+    def get_user(self, validated_token):
+        if not settings.JWT_USER_CACHE:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = user_cache_key(user_id)
+        record = cache.get(key)
+        if record is None:
+            record = self.load_record(user_id)
+            if record is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            cache.set(key, record, USER_CACHE_TIMEOUT)
+
+        if not record["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN and (
+            validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != record["password_hash"]
+        ):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+
+        return user_from_record(record)
+
+    def load_record(self, user_id):
+        fields = [*USER_CACHE_FIELDS, "password"] if api_settings.CHECK_REVOKE_TOKEN else USER_CACHE_FIELDS
+        record = (
+            User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values(*fields).first()
+        )
+        if record is not None and api_settings.CHECK_REVOKE_TOKEN:
+            # only the digest revoked tokens are checked against is cached
+            record["password_hash"] = get_md5_hash_password(record.pop("password"))
+        return record
+
+
+def user_from_record(record):
+    """
+    Build a user from cached fields, with all the other fields deferred.
+    """
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in USER_CACHE_FIELDS]
+    return User.from_db(DEFAULT_DB_ALIAS, names, [record[name] for name in names])
@@ -0,0 +1,9 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """
+    Document CachedJWTAuthentication as the bearer JWT scheme it is.
+    """
+
+    target_class = "account.authentication.CachedJWTAuthentication"
@@ -1,3 +1,56 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+User = get_user_model()
+
+
+# slow request logs would only clutter the test output
+@override_settings(SLOW_REQUEST_THRESHOLD_MS=60_000, JWT_USER_CACHE=True, TASK_ANALYTICS_CACHE=True)
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="tester", email="tester@example.com", password="password123!"
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_cached_user_costs_no_queries(self):
+        url = reverse("task-analytics")
+        # user + analytics (counts, tag counts)
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        # both cached
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    @override_settings(JWT_USER_CACHE=False)
+    def test_disabled_without_a_shared_cache(self):
+        url = reverse("tasks")
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        # a deactivation applies even where no signal dropped the entry
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_deactivation_invalidates_the_cached_user(self):
+        url = reverse("tasks")
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_cached_user_only_saves_loaded_fields(self):
+        response = self.client.patch("/api/auth/users/me/", {"username": "renamed"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.username, "renamed")
+        self.assertTrue(self.user.check_password("password123!"))
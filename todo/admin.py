@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Task, Tag
+from .models import ArchivedTask, Task, Tag, TimeEntry
 
 admin.site.register(Task)
 admin.site.register(Tag)
+admin.site.register(TimeEntry)
+admin.site.register(ArchivedTask)
@@ -0,0 +1,146 @@
+"""
+Archiving of done tasks.
+
+Done tasks that have not changed for TASK_ARCHIVE_AFTER_DAYS are moved
+from the Task table to ArchivedTask by archive_done_tasks(), run daily by
+CELERY_BEAT_SCHEDULE, so that the per-user task scans only cover the
+tasks that are still in use. Archiving deletes the task, leaving a
+tombstone, so syncing clients drop it like a deleted task.
+
+Each batch costs a constant number of queries: the tasks, their tag
+names and their time entries are read with one query each, copied with
+one bulk insert and deleted together.
+
+restore_task() moves a task back, with the same id, tags and time
+entries.
+
+Recurring tasks are archived oldest occurrence first, and only once their
+next occurrence exists, so archiving never makes a task due for a new
+occurrence.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_duration
+
+from .cache import invalidate_user_tasks
+from .models import ArchivedTask, Task, TaskTombstone, TimeEntry
+from .recurrence import pending_recurrences
+from .serializers import bulk_set_tags
+
+# Task fields copied to and from ArchivedTask.
+FIELDS = [
+    "id", "user_id", "title", "description", "status", "priority",
+    "recurrence", "recurrence_end", "due_date", "start_time", "end_time",
+    "time_spent", "created_at", "updated_at", "recurrence_generated_at",
+    "recurrence_day",
+]
+
+
+def archivable_tasks(cutoff, now=None):
+    """
+    Done tasks last changed before `cutoff` that can be archived.
+    """
+    return (
+        Task.objects.filter(status="done", updated_at__lt=cutoff, previous_occurrence__isnull=True)
+        .exclude(pk__in=pending_recurrences(now).values("pk"))
+    )
+
+
+def archive_done_tasks(older_than=None, now=None, batch_size=500):
+    """
+    Move done tasks that have not changed for `older_than` (by default,
+    TASK_ARCHIVE_AFTER_DAYS) to the archive, in batches of `batch_size`.
+
+    Returns the number of tasks archived.
+    """
+    now = now or timezone.now()
+    older_than = older_than or timedelta(days=settings.TASK_ARCHIVE_AFTER_DAYS)
+    tasks = archivable_tasks(now - older_than, now).order_by("updated_at")
+
+    archived = 0
+    while True:
+        with transaction.atomic():
+            rows = list(tasks.select_for_update().values(*FIELDS)[:batch_size])
+            if rows:
+                _archive(rows, now)
+        archived += len(rows)
+        if len(rows) < batch_size:
+            return archived
+
+
+def _archive(rows, now):
+    ids = [row["id"] for row in rows]
+
+    tags = {pk: [] for pk in ids}
+    for task_id, name in Task.tags.through.objects.filter(task_id__in=ids).values_list(
+        "task_id", "tag__name"
+    ):
+        tags[task_id].append(name)
+
+    time_entries = {pk: [] for pk in ids}
+    for entry in (
+        TimeEntry.objects.filter(task_id__in=ids)
+        .order_by("started_at")
+        .values("id", "task_id", "started_at", "ended_at", "duration")
+    ):
+        # DjangoJSONEncoder would drop the microseconds
+        for field in ("started_at", "ended_at"):
+            entry[field] = entry[field] and entry[field].isoformat()
+        time_entries[entry.pop("task_id")].append(entry)
+
+    next_occurrences = dict(
+        Task.objects.filter(previous_occurrence_id__in=ids).values_list("previous_occurrence_id", "pk")
+    )
+
+    ArchivedTask.objects.bulk_create([
+        ArchivedTask(
+            **row,
+            tags=tags[row["id"]],
+            time_entries=time_entries[row["id"]],
+            next_occurrence_id=next_occurrences.get(row["id"]),
+            archived_at=now,
+        )
+        for row in rows
+    ])
+    # leaves tombstones, and the post_delete signal invalidates the
+    # owners' cached tasks
+    Task.objects.filter(pk__in=ids).delete()
+
+
+@transaction.atomic
+def restore_task(archived):
+    """
+    Move an archived task back to the Task table and return it.
+    """
+    task = Task(**{field: getattr(archived, field) for field in FIELDS})
+    task.save(force_insert=True)
+    # auto_now_add overwrote created_at on insert
+    Task.objects.filter(pk=task.pk).update(created_at=archived.created_at)
+    task.created_at = archived.created_at
+
+    bulk_set_tags({task.pk: archived.tags})
+    TimeEntry.objects.bulk_create([
+        TimeEntry(
+            id=entry["id"],
+            task=task,
+            started_at=parse_datetime(entry["started_at"]),
+            ended_at=entry["ended_at"] and parse_datetime(entry["ended_at"]),
+            duration=entry["duration"] and parse_duration(entry["duration"]),
+        )
+        for entry in archived.time_entries
+    ])
+    if archived.next_occurrence_id is not None:
+        # relink the occurrence generated from the task, so that it is
+        # not due for another one
+        Task.objects.filter(pk=archived.next_occurrence_id, previous_occurrence__isnull=True).update(
+            previous_occurrence=task, updated_at=timezone.now()
+        )
+
+    TaskTombstone.objects.filter(pk=task.pk).delete()
+    archived.delete()
+    invalidate_user_tasks(task.user_id)
+    return task
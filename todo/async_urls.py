@@ -0,0 +1,8 @@
+from django.urls import path
+from .async_views import AsyncTaskListView, AsyncTaskDetailView, AsyncTaskAnalyticsView
+
+urlpatterns = [
+    path("", AsyncTaskListView.as_view(), name="async-tasks"),
+    path("<uuid:pk>/", AsyncTaskDetailView.as_view(), name="async-task-detail"),
+    path("analytics/", AsyncTaskAnalyticsView.as_view(), name="async-task-analytics"),
+]
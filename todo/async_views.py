@@ -0,0 +1,148 @@
+"""
+Async (ASGI) versions of the read-only task endpoints.
+
+These mirror the GET handlers of TaskListCreateView, TaskDetailView and
+TaskAnalyticsView but are plain async Django views using the async ORM, so
+a request waiting on the database does not hold a worker thread when
+served by an ASGI server (see todoAPI/asgi.py). Writes stay on the DRF
+views.
+
+Authentication uses the DRF authentication classes from REST_FRAMEWORK,
+run in a thread since they may query the database.
+"""
+
+from asgiref.sync import sync_to_async
+from django.db.models import prefetch_related_objects
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .cache import get_analytics, set_analytics
+from .etags import conditional_response, task_etag, task_list_etag
+from .filters import TaskFilter
+from .instrumentation import timed
+from .models import Task
+from .pagination import TaskCursorPagination
+from .renderers import dumps
+from .routers import replica_reads
+from .serializers import TaskSerializer
+
+
+def json_response(data, status=200, **kwargs):
+    return HttpResponse(dumps(data), status=status, content_type="application/json", **kwargs)
+
+
+@sync_to_async
+def authenticate(request):
+    """
+    Return the user authenticated by the configured DRF authentication
+    classes, or None. As in an APIView, they are given a DRF Request.
+    """
+    drf_request = Request(
+        request,
+        authenticators=[cls() for cls in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    user = drf_request.user
+    return user if user.is_authenticated else None
+
+
+class AsyncAPIView(View):
+    """
+    Base class for async task views: authenticates the request and
+    returns DRF-style JSON errors.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            user = await authenticate(request)
+        except exceptions.AuthenticationFailed as e:
+            return json_response({"detail": e.detail}, status=401)
+        if user is None or not user.is_active:
+            return json_response(
+                {"detail": "Authentication credentials were not provided."}, status=401
+            )
+
+        request.user = user
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncTaskListView(AsyncAPIView):
+    """
+    Async version of TaskListCreateView.get.
+    """
+
+    pagination_class = TaskCursorPagination
+
+    @replica_reads
+    async def get(self, request):
+        etag = await sync_to_async(task_list_etag)(request)
+        not_modified = conditional_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        tasks = Task.objects.filter(user=request.user).with_related()
+
+        if not await tasks.aexists():
+            return json_response(
+                {"detail": "All clean. You have no tasks today."}, headers={"ETag": etag}
+            )
+
+        filterset = TaskFilter(request.GET, queryset=tasks, request=request)
+        if not filterset.is_valid():
+            return json_response(filterset.errors, status=400)
+        tasks = filterset.qs
+
+        paginator = self.pagination_class()
+        try:
+            page_queryset = paginator.get_page_queryset(tasks, Request(request))
+        except exceptions.NotFound as e:
+            return json_response({"detail": e.detail}, status=404)
+        page = paginator.set_page([task async for task in page_queryset])
+
+        with timed("serialize"):
+            results = TaskSerializer(page, many=True).data
+        return json_response({
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
+            "results": results,
+        }, headers={"ETag": etag})
+
+
+class AsyncTaskDetailView(AsyncAPIView):
+    """
+    Async version of TaskDetailView.get.
+    """
+
+    async def get(self, request, pk):
+        try:
+            task = await Task.objects.select_related("user").aget(pk=pk, user=request.user)
+        except Task.DoesNotExist:
+            return json_response({"detail": "Not found."}, status=404)
+
+        etag = task_etag(task)
+        not_modified = conditional_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        await sync_to_async(prefetch_related_objects)([task], "tags")
+        with timed("serialize"):
+            data = TaskSerializer(task).data
+        return json_response(data, headers={"ETag": etag})
+
+
+class AsyncTaskAnalyticsView(AsyncAPIView):
+    """
+    Async version of TaskAnalyticsView.get.
+    """
+
+    @replica_reads
+    async def get(self, request):
+        data = await sync_to_async(get_analytics)(request.user.pk)
+
+        if data is None:
+            data = await Task.objects.filter(user=request.user).aanalytics()
+            await sync_to_async(set_analytics)(request.user.pk, data)
+
+        return json_response(data)
@@ -0,0 +1,309 @@
+"""
+Benchmark suite for the task API, driven by the benchmark_api command.
+
+seed() creates benchmark users with tasks and tags in bulk, SCENARIOS
+describe the requests to time, and run_test_client() / run_http() send
+them concurrently, through Django's test client or over HTTP to a running
+server. Each run is summarized as throughput, latency percentiles and the
+median number of database queries per request, read from the
+Server-Timing header of todo.instrumentation (sent with
+PERFORMANCE_INSTRUMENTATION on, and only to INTERNAL_IPS unless DEBUG is
+on).
+
+Summaries can be saved as a JSON baseline and later runs compared to it.
+"""
+
+import asyncio
+import http.client
+import json
+import random
+import re
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, transaction
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import Tag, Task
+from .serializers import bulk_create_tasks
+
+User = get_user_model()
+
+SEED_BATCH_SIZE = 5000
+BULK_UPDATE_SIZE = 50
+
+_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def seed(users=1, tasks=1000, tags=20, tags_per_task=2, seed=0):
+    """
+    Create benchmark users, each with `tasks` tasks tagged from a pool of
+    `tags` tags. Returns (users, tag names); remove them with cleanup().
+    """
+    rng = random.Random(seed)
+    suffix = uuid.uuid4().hex[:8]
+    tag_names = [f"bench-{suffix}-{i}" for i in range(tags)]
+    created = []
+    for n in range(users):
+        user = User.objects.create_user(
+            username=f"bench-{suffix}-{n}",
+            email=f"bench-{suffix}-{n}@example.com",
+            password=uuid.uuid4().hex,
+        )
+        created.append(user)
+        for start in range(0, tasks, SEED_BATCH_SIZE):
+            with transaction.atomic():
+                bulk_create_tasks([
+                    {
+                        "user": user,
+                        "title": f"Task {i}",
+                        "description": f"Benchmark task {i}",
+                        "status": rng.choice(Task.STATUS_CHOICES)[0],
+                        "priority": rng.choice(Task.PRIORITY_CHOICES)[0],
+                        "tags": rng.sample(tag_names, min(tags_per_task, tags)),
+                    }
+                    for i in range(start, min(start + SEED_BATCH_SIZE, tasks))
+                ])
+    return created, tag_names
+
+
+def cleanup(users, tag_names):
+    for user in users:
+        user.delete()
+    Tag.objects.filter(name__in=tag_names).delete()
+
+
+def _list(context, i):
+    return "GET", reverse("tasks"), None
+
+
+def _detail(context, i):
+    return "GET", reverse("task-detail", args=[context["rng"].choice(context["task_ids"])]), None
+
+
+def _create(context, i):
+    return "POST", reverse("tasks"), {"title": f"Created {i}", "tags": context["tag_names"][:2]}
+
+
+def _update(context, i):
+    pk = context["rng"].choice(context["task_ids"])
+    return "PUT", reverse("task-detail", args=[pk]), {"title": f"Updated {i}", "priority": ("low", "high")[i % 2]}
+
+
+def _bulk(context, i):
+    ids = context["rng"].sample(context["task_ids"], min(BULK_UPDATE_SIZE, len(context["task_ids"])))
+    priority = ("low", "medium", "high")[i % 3]
+    return "PATCH", reverse("task-bulk"), [{"id": str(pk), "priority": priority} for pk in ids]
+
+
+def _analytics(context, i):
+    return "GET", reverse("task-analytics"), None
+
+
+SCENARIOS = {
+    "list": _list,
+    "detail": _detail,
+    "create": _create,
+    "update": _update,
+    "bulk": _bulk,
+    "analytics": _analytics,
+}
+
+
+# Scenarios with an async view, for run_async_client().
+ASYNC_SCENARIOS = ["list", "detail", "analytics"]
+
+
+def scenario_context(user, tag_names, seed=0):
+    """
+    State the scenarios build a user's requests from.
+    """
+    return {
+        "headers": {"Authorization": f"Bearer {AccessToken.for_user(user)}"},
+        "task_ids": list(Task.objects.filter(user=user).values_list("pk", flat=True)[:10_000]),
+        "tag_names": tag_names,
+        "rng": random.Random(seed),
+    }
+
+
+def run_test_client(scenario, contexts, requests, concurrency):
+    """
+    Send `requests` requests of a scenario through Django's test client
+    from `concurrency` threads, on behalf of the users of `contexts` in
+    turn. Returns the summary.
+    """
+    make_request = SCENARIOS[scenario]
+
+    def fetch(i):
+        context = contexts[i % len(contexts)]
+        method, path, body = make_request(context, i)
+        # failed requests are counted as errors rather than raised
+        client = Client(headers=context["headers"], raise_request_exception=False)
+        kwargs = {} if body is None else {"data": body, "content_type": "application/json"}
+        start = time.perf_counter()
+        response = getattr(client, method.lower())(path, **kwargs)
+        latency = time.perf_counter() - start
+        close_old_connections()
+        return latency, response.status_code, response.headers.get("Server-Timing")
+
+    return _run(fetch, requests, concurrency)
+
+
+def run_async_client(scenario, contexts, requests, concurrency):
+    """
+    Like run_test_client(), but send the requests of a read-only scenario
+    (ASYNC_SCENARIOS) to its async view (todo.async_views) through
+    Django's async test client, from one event loop with `concurrency`
+    requests in flight.
+    """
+    make_request = SCENARIOS[scenario]
+    prefix, async_prefix = reverse("tasks"), reverse("async-tasks")
+
+    async def fetch(client, semaphore, i):
+        context = contexts[i % len(contexts)]
+        _, path, _ = make_request(context, i)
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(async_prefix + path[len(prefix):], headers=context["headers"])
+            return time.perf_counter() - start, response.status_code, response.headers.get("Server-Timing")
+
+    async def run():
+        # failed requests are counted as errors rather than raised
+        client = AsyncClient(raise_request_exception=False)
+        semaphore = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*(fetch(client, semaphore, i) for i in range(requests)))
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    return summarize(results, time.perf_counter() - start)
+
+
+def run_http(scenario, contexts, requests, concurrency, base_url):
+    """
+    Send `requests` requests of a scenario to a running server at
+    `base_url` from `concurrency` threads, each with a keep-alive
+    connection, on behalf of the users of `contexts` in turn. Returns the
+    summary.
+    """
+    make_request = SCENARIOS[scenario]
+    url = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+    connections = {}
+
+    def fetch(i):
+        context = contexts[i % len(contexts)]
+        method, path, body = make_request(context, i)
+        headers = dict(context["headers"])
+        if body is not None:
+            body = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+
+        connection = connections.get(threading.get_ident())
+        if connection is None:
+            connection = connections[threading.get_ident()] = connection_class(url.netloc, timeout=60)
+        start = time.perf_counter()
+        try:
+            connection.request(method, url.path.rstrip("/") + path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            return time.perf_counter() - start, 0, None
+        return time.perf_counter() - start, response.status, response.getheader("Server-Timing")
+
+    try:
+        return _run(fetch, requests, concurrency)
+    finally:
+        for connection in connections.values():
+            connection.close()
+
+
+def _run(fetch, requests, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(fetch, range(requests)))
+    return summarize(results, time.perf_counter() - start)
+
+
+def summarize(results, elapsed):
+    """
+    Summarize (latency, status, Server-Timing header) results.
+    """
+    latencies = sorted(latency for latency, _, _ in results)
+    queries = [
+        int(match.group(1))
+        for _, _, timing in results
+        if timing and (match := _QUERIES.search(timing))
+    ]
+    return {
+        "requests": len(results),
+        "errors": sum(1 for _, status, _ in results if not 200 <= status < 300),
+        "rps": round(len(results) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p90_ms": round(percentile(latencies, 0.90) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "queries": statistics.median(queries) if queries else None,
+    }
+
+
+def format_summary(label, summary):
+    """
+    Format a summary as one line of a report.
+    """
+    queries = "-" if summary["queries"] is None else f"{summary['queries']:g}"
+    return (
+        f"{label:<10} {summary['rps']:8.1f} req/s   p50 {summary['p50_ms']:7.1f} ms   "
+        f"p90 {summary['p90_ms']:7.1f} ms   p99 {summary['p99_ms']:7.1f} ms   "
+        f"{queries:>3} queries   {summary['errors']} errors"
+    )
+
+
+def best_of(func, rounds):
+    """
+    Call `func` `rounds` times and return the fastest run, in seconds.
+    """
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def compare(results, baseline, tolerance):
+    """
+    Return a list of regressions of `results` against `baseline` (both
+    {scenario: summary}): median latency more than `tolerance` (a
+    fraction) above the baseline, more queries, or new errors.
+    """
+    regressions = []
+    for scenario, summary in results.items():
+        previous = baseline.get(scenario)
+        if previous is None:
+            continue
+        if summary["p50_ms"] > previous["p50_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{scenario}: p50 {summary['p50_ms']} ms, baseline {previous['p50_ms']} ms"
+            )
+        if (
+            summary["queries"] is not None
+            and previous.get("queries") is not None
+            and summary["queries"] > previous["queries"]
+        ):
+            regressions.append(
+                f"{scenario}: {summary['queries']} queries, baseline {previous['queries']}"
+            )
+        if summary["errors"] and not previous.get("errors"):
+            regressions.append(f"{scenario}: {summary['errors']} failed requests")
+    return regressions
@@ -0,0 +1,151 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Seconds a user's analytics stay cached. Writes invalidate them straight
+# away; the timeout only bounds how stale the time-dependent overdue count
+# can get.
+ANALYTICS_CACHE_TIMEOUT = 60
+
+# Seconds a rendered task list page or task detail stays cached. Entries
+# are keyed by the user's task version, so writes make them unreachable
+# straight away; the timeout only lets stale versions expire.
+PAGE_CACHE_TIMEOUT = 300
+
+CACHE_STATS_KEYS = {
+    True: "todo:page-cache:hits",
+    False: "todo:page-cache:misses",
+}
+
+
+def analytics_cache_key(user_id):
+    return f"todo:analytics:{user_id}"
+
+
+def task_version_cache_key(user_id):
+    return f"todo:version:{user_id}"
+
+
+def recent_write_cache_key(user_id):
+    return f"todo:recent-write:{user_id}"
+
+
+def page_cache_key(user_id, version, *parts):
+    """
+    Key for a cached response body of one of the user's task endpoints,
+    identified by `parts` (endpoint name, path, filters...).
+    """
+    digest = hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()
+    return f"todo:page:{user_id}:{version}:{digest}"
+
+
+def get_cached_page(key):
+    """
+    Return the cached value for `key` (None on a miss), counting hits and misses.
+
+    Always a miss unless TASK_PAGE_CACHE is on: invalidation relies on a
+    cache shared by all workers.
+    """
+    if not settings.TASK_PAGE_CACHE:
+        return None
+    value = cache.get(key)
+    _count(value is not None)
+    return value
+
+
+def set_cached_page(key, value):
+    if settings.TASK_PAGE_CACHE:
+        cache.set(key, value, PAGE_CACHE_TIMEOUT)
+
+
+def _count(hit):
+    key = CACHE_STATS_KEYS[hit]
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def get_cache_stats():
+    """
+    Hit and miss counts of the task page cache, across all processes.
+    """
+    hits = cache.get(CACHE_STATS_KEYS[True], 0)
+    misses = cache.get(CACHE_STATS_KEYS[False], 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / total if total else None,
+    }
+
+
+def reset_cache_stats():
+    cache.delete_many(list(CACHE_STATS_KEYS.values()))
+
+
+def get_analytics(user_id):
+    """
+    Return the user's cached analytics, or None.
+
+    Always a miss unless TASK_ANALYTICS_CACHE is on: invalidation relies on
+    a cache shared by all workers.
+    """
+    if not settings.TASK_ANALYTICS_CACHE:
+        return None
+    return cache.get(analytics_cache_key(user_id))
+
+
+def set_analytics(user_id, data):
+    if settings.TASK_ANALYTICS_CACHE:
+        cache.set(analytics_cache_key(user_id), data, ANALYTICS_CACHE_TIMEOUT)
+
+
+def get_task_version(user_id):
+    """
+    Return a number that changes whenever any of the user's tasks change.
+
+    A missing (or evicted) counter restarts from the current time in
+    nanoseconds, so it never repeats a value handed out before.
+    """
+    key = task_version_cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_task_version(user_id):
+    key = task_version_cache_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def invalidate_user_tasks(user_id):
+    """
+    Once the current transaction commits, bump the user's task version and
+    drop their cached analytics. With read replicas, the user's reads also
+    stay on the primary for REPLICA_LAG_SECONDS (see has_recent_write()).
+    """
+    def invalidate():
+        _bump_task_version(user_id)
+        cache.delete(analytics_cache_key(user_id))
+        if settings.DATABASE_REPLICAS:
+            cache.set(recent_write_cache_key(user_id), True, settings.REPLICA_LAG_SECONDS)
+
+    transaction.on_commit(invalidate)
+
+
+def has_recent_write(user_id):
+    """
+    Whether the user changed a task in the last REPLICA_LAG_SECONDS, so
+    replicas may not have their change yet.
+    """
+    return cache.get(recent_write_cache_key(user_id), False)
@@ -0,0 +1,56 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+
+from .models import Task
+
+
+def task_etag(task):
+    """
+    Strong ETag for a single task, changing whenever the task is saved.
+    """
+    return f'"{task.pk.hex}-{int(task.updated_at.timestamp() * 1_000_000)}"'
+
+
+def task_list_version(user_id):
+    """
+    A value that changes whenever one of the user's tasks is created,
+    changed or deleted: their number of tasks and latest updated_at.
+
+    Read from the database (one aggregate over the (user, updated_at, id)
+    index) rather than the cache, so every worker agrees on it whatever
+    the cache backend.
+    """
+    state = Task.objects.filter(user_id=user_id).aggregate(count=Count("id"), updated_at=Max("updated_at"))
+    updated_at = state["updated_at"]
+    return f"{state['count']}-{int(updated_at.timestamp() * 1_000_000) if updated_at else 0}"
+
+
+def task_list_etag(request):
+    """
+    Strong ETag for a page of the user's task list.
+
+    Derived from the user's task_list_version() and the request path,
+    query string and Accept header.
+    """
+    key = "|".join([
+        str(request.user.pk),
+        task_list_version(request.user.pk),
+        request.get_full_path(),
+        request.META.get("HTTP_ACCEPT", ""),
+    ])
+    return f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+
+def conditional_response(request, etag):
+    """
+    Evaluate If-None-Match/If-Match against `etag`.
+
+    Returns a 304 or 412 response to send instead of doing the work, or
+    None if the request should go ahead.
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is not None and response.status_code == 304:
+        response["ETag"] = etag
+    return response
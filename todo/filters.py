@@ -1,17 +1,63 @@
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
 from django_filters import rest_framework as filters
 from .models import Task
 
+
+def has_tag(**lookups):
+    """
+    EXISTS subquery matching tasks with a tag satisfying the lookups
+    (e.g. name="work"). Unlike filtering across the tags join, it cannot
+    return a task more than once.
+    """
+    tag_lookups = {f"tag__{lookup}": value for lookup, value in lookups.items()}
+    return Exists(Task.tags.through.objects.filter(task=OuterRef("pk"), **tag_lookups))
+
+
 class TaskFilter(filters.FilterSet):
     """
-    FilterSet for filtering tasks by status and tags.
+    FilterSet for filtering and ordering tasks.
+
+    Filters:
+        tags: Comma separated tag names; tasks must have all of them.
+        tags_prefix: Tasks with a tag whose name starts with the value.
+        status, priority: Exact match.
+        due_after, due_before: Due date range (inclusive).
+        overdue: Only unfinished tasks whose due date has passed (or, if
+            false, all other tasks).
+        ordering: created_at or updated_at, prefixed with "-" for newest
+            first. Both are keyset paginated on a (user, field, id) index.
     """
 
-    # Filter by tag (ManyToMany field), looking for tasks that have a specific tag.
-    tags = filters.CharFilter(field_name="tags__name", lookup_expr="icontains")
+    # Filter by tags (ManyToMany field) with EXISTS subqueries on the exact names.
+    tags = filters.CharFilter(method="filter_tags")
+    tags_prefix = filters.CharFilter(method="filter_tags_prefix")
 
     # Filter by status (pending, in_progress, done)
     status = filters.ChoiceFilter(choices=Task.STATUS_CHOICES)
+    priority = filters.ChoiceFilter(choices=Task.PRIORITY_CHOICES)
+
+    due_after = filters.IsoDateTimeFilter(field_name="due_date", lookup_expr="gte")
+    due_before = filters.IsoDateTimeFilter(field_name="due_date", lookup_expr="lte")
+    overdue = filters.BooleanFilter(method="filter_overdue")
+
+    ordering = filters.OrderingFilter(fields=["created_at", "updated_at"])
 
     class Meta:
         model = Task
-        fields = ['tags', 'status', 'priority']
+        fields = ['tags', 'tags_prefix', 'status', 'priority', 'due_after', 'due_before', 'overdue']
+
+    def filter_tags(self, queryset, name, value):
+        for tag_name in {tag_name.strip() for tag_name in value.split(",")} - {""}:
+            queryset = queryset.filter(has_tag(name=tag_name))
+        return queryset
+
+    def filter_tags_prefix(self, queryset, name, value):
+        return queryset.filter(has_tag(name__startswith=value))
+
+    def filter_overdue(self, queryset, name, value):
+        # matches the condition of the partial task_user_open_due_idx index
+        now = timezone.now()
+        if value:
+            return queryset.filter(due_date__lt=now).exclude(status="done")
+        return queryset.filter(Q(due_date__isnull=True) | Q(due_date__gte=now) | Q(status="done"))
@@ -0,0 +1,65 @@
+"""
+Task history: an audit trail of task updates and deletions.
+
+Writers compute the changed fields with task_changes() and pass them to
+record(), which inserts every record with one bulk insert once the
+transaction commits. Nothing is written for a rolled back transaction,
+and a write adds one insert however many tasks or fields it changes.
+
+Old values come from the instances being written, so diffing costs no
+queries (only the old tags of retagged tasks are fetched by the writers,
+with one query).
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import TaskHistory
+
+# Records inserted per INSERT statement.
+BATCH_SIZE = 500
+
+
+def task_changes(task, attrs):
+    """
+    Return {field: [old value, new value]} for the attributes in `attrs`
+    that differ from the task's.
+    """
+    return {
+        field: [getattr(task, field), value]
+        for field, value in attrs.items()
+        if getattr(task, field) != value
+    }
+
+
+def tag_changes(old_tags, new_tags):
+    """
+    Return the "tags" change between two lists of tag names, or {} if
+    they are the same set.
+    """
+    old_tags, new_tags = sorted(set(old_tags)), sorted(set(new_tags))
+    return {"tags": [old_tags, new_tags]} if old_tags != new_tags else {}
+
+
+def record(user_id, changes, action="update"):
+    """
+    Add history records for the user's tasks once the current transaction
+    commits. `changes` maps task ids to their changes; tasks with no
+    change are skipped, except for deletions.
+    """
+    now = timezone.now()
+    entries = [
+        TaskHistory(task_id=task_id, user_id=user_id, action=action, changes=diff, changed_at=now)
+        for task_id, diff in changes.items()
+        if diff or action == "delete"
+    ]
+    if entries:
+        transaction.on_commit(lambda: _write(entries))
+
+
+def _write(entries):
+    if len(entries) == 1:
+        # a plain INSERT; bulk_create() would wrap it in a transaction
+        entries[0].save(force_insert=True)
+    else:
+        TaskHistory.objects.bulk_create(entries, batch_size=BATCH_SIZE)
@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+
+from django.db import DatabaseError, transaction
+
+from .cache import invalidate_user_tasks
+from .serializers import TaskSerializer, bulk_create_tasks
+
+FORMATS = ("csv", "ndjson")
+
+# CSV files hold a task's tags in one column, separated by this character.
+CSV_TAG_SEPARATOR = ";"
+
+
+def parse_ndjson(stream):
+    """
+    Yield (line number, row) for every non-blank line of an NDJSON text stream.
+    Lines that are not JSON objects are yielded as (line number, None).
+    """
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def parse_csv(stream):
+    """
+    Yield (line number, row) for every record of a CSV text stream with a
+    header line. Empty cells are left out so that model defaults apply.
+    """
+    reader = csv.DictReader(stream)
+    for row in reader:
+        row = {key: value for key, value in row.items() if key and value not in ("", None)}
+        if "tags" in row:
+            row["tags"] = [tag for tag in row["tags"].split(CSV_TAG_SEPARATOR) if tag.strip()]
+        yield reader.line_num, row
+
+
+class TaskImporter:
+    """
+    Import tasks for a user from a CSV or NDJSON stream.
+
+    The input is parsed lazily and processed `batch_size` rows at a time:
+    each row is validated with TaskSerializer, then the valid rows of the
+    batch are written with bulk inserts (tags resolved in bulk) inside a
+    savepoint. Invalid rows are reported with their line number and do not
+    stop the import; a batch that fails to write is retried row by row, so
+    that only the rows the database rejects are reported.
+
+    Past due dates are accepted, so that exported tasks can be imported
+    again.
+
+    At most `max_errors` errors are kept (None keeps them all).
+    """
+
+    def __init__(self, user, batch_size=500, max_errors=100):
+        self.user = user
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def run(self, stream, input_format):
+        """
+        Import every row of a text stream in the given format.
+        """
+        if input_format not in FORMATS:
+            raise ValueError(f"Unknown input format {input_format!r}.")
+        rows = parse_csv(stream) if input_format == "csv" else parse_ndjson(stream)
+
+        batch = []
+        for line_number, row in rows:
+            batch.append((line_number, row))
+            if len(batch) == self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+
+        if self.created:
+            invalidate_user_tasks(self.user.pk)
+        return self
+
+    def import_batch(self, batch):
+        valid = []
+        for line_number, row in batch:
+            if row is None:
+                self.add_error(line_number, {"non_field_errors": ["Invalid row."]})
+                continue
+            serializer = TaskSerializer(data={"tags": [], **row}, context={"allow_past_due_date": True})
+            if serializer.is_valid():
+                valid.append((line_number, {**serializer.validated_data, "user": self.user}))
+            else:
+                self.add_error(line_number, serializer.errors)
+
+        if not valid:
+            return
+
+        if self.write([data for _, data in valid]) is not None:
+            # find the rows the database rejects
+            for line_number, data in valid:
+                error = self.write([data])
+                if error is not None:
+                    self.add_error(line_number, {"non_field_errors": [str(error)]})
+
+    def write(self, rows):
+        """
+        Create the tasks of validated rows inside a savepoint. Returns the
+        database error if it fails, None otherwise.
+        """
+        try:
+            with transaction.atomic():
+                # bulk_create_tasks() pops the tags
+                bulk_create_tasks([dict(data) for data in rows])
+        except DatabaseError as e:
+            return e
+        self.created += len(rows)
+        return None
+
+    def add_error(self, line_number, errors):
+        self.failed += 1
+        if self.max_errors is None or len(self.errors) < self.max_errors:
+            self.errors.append({"line": line_number, "errors": errors})
+
+    @property
+    def result(self):
+        return {
+            "created": self.created,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+def text_stream(binary_file):
+    """
+    Wrap an uploaded (binary) file for line by line text reading.
+    """
+    return io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
@@ -0,0 +1,315 @@
+"""
+Request-level performance instrumentation for the todo views.
+
+PerformanceMiddleware measures, for each request to a view of todo.views
+or todo.async_views:
+
+    - wall time,
+    - number and total time of database queries,
+    - serialization time (code wrapped in timed("serialize")) and JSON
+      rendering time (FastJSONRenderer),
+    - response size.
+
+The measurements are sent back in a Server-Timing header (with DEBUG on,
+or to clients in INTERNAL_IPS only, as it exposes database timings),
+aggregated into Prometheus counters and histograms served by
+metrics_view, and requests
+slower than SLOW_REQUEST_THRESHOLD_MS are logged with their SQL to the
+"todo.performance" logger.
+
+The metrics are kept in process memory, so each worker process exposes its
+own. All of this is off unless PERFORMANCE_INSTRUMENTATION is set.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+logger = logging.getLogger("todo.performance")
+
+INSTRUMENTED_MODULES = ("todo.views", "todo.async_views")
+
+# Slow request logs show at most this many queries, truncated to this length.
+MAX_LOGGED_QUERIES = 50
+MAX_LOGGED_SQL_LENGTH = 500
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_current = ContextVar("todo_request_metrics", default=None)
+
+
+class RequestMetrics:
+    """
+    Measurements of the request being handled.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = []
+        self.timings = {}
+
+    @property
+    def db_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def add_time(self, name, duration):
+        self.timings[name] = self.timings.get(name, 0.0) + duration
+
+
+@contextmanager
+def timed(name):
+    """
+    Add the time spent in the block to the current request's `name` timing.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_time(name, time.perf_counter() - start)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper timing queries made while handling a request.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries.append((sql, time.perf_counter() - start))
+
+
+def install_query_recorder(connection, **kwargs):
+    """
+    Add record_query to a connection. Every new connection gets it (see
+    todo.signals), so that queries run in other threads, like those of
+    the async views, are recorded too.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Counter:
+    """
+    Prometheus counter, by label values.
+    """
+
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values = {}
+
+    def inc(self, labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def expose(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    """
+    Prometheus histogram, by label values.
+    """
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.values = {}
+
+    def observe(self, labels, value):
+        bucket_counts, total, count = self.values.get(labels, ([0] * len(self.buckets), 0, 0))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                bucket_counts[i] += 1
+        self.values[labels] = (bucket_counts, total + value, count + 1)
+
+    def expose(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        bucket_labelnames = (*self.labelnames, "le")
+        for labels, (bucket_counts, total, count) in sorted(self.values.items()):
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), (*bucket_counts, count)):
+                yield f"{self.name}_bucket{format_labels(bucket_labelnames, (*labels, bound))} {bucket_count}"
+            yield f"{self.name}_sum{format_labels(self.labelnames, labels)} {total}"
+            yield f"{self.name}_count{format_labels(self.labelnames, labels)} {count}"
+
+
+def format_labels(names, values):
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+_lock = threading.Lock()
+
+REQUESTS = Counter(
+    "todo_requests_total", "Requests to the todo views.", ("view", "method", "status")
+)
+REQUEST_DURATION = Histogram(
+    "todo_request_duration_seconds", "Wall time of requests.", ("view",), DURATION_BUCKETS
+)
+DB_QUERIES = Histogram(
+    "todo_db_queries", "Database queries per request.", ("view",), QUERY_COUNT_BUCKETS
+)
+DB_DURATION = Histogram(
+    "todo_db_duration_seconds", "Database time per request.", ("view",), DURATION_BUCKETS
+)
+SERIALIZE_DURATION = Histogram(
+    "todo_serialize_duration_seconds",
+    "Serialization and rendering time per request.",
+    ("view",),
+    DURATION_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "todo_response_size_bytes", "Size of non-streaming response bodies.", ("view",), SIZE_BUCKETS
+)
+
+METRICS = [REQUESTS, REQUEST_DURATION, DB_QUERIES, DB_DURATION, SERIALIZE_DURATION, RESPONSE_SIZE]
+
+
+def observe(view, method, status, metrics, total, size):
+    with _lock:
+        REQUESTS.inc((view, method, str(status)))
+        REQUEST_DURATION.observe((view,), total)
+        DB_QUERIES.observe((view,), len(metrics.queries))
+        DB_DURATION.observe((view,), metrics.db_time)
+        SERIALIZE_DURATION.observe(
+            (view,), metrics.timings.get("serialize", 0.0) + metrics.timings.get("render", 0.0)
+        )
+        if size is not None:
+            RESPONSE_SIZE.observe((view,), size)
+
+
+def expose_metrics():
+    """
+    Return all metrics in the Prometheus text format.
+    """
+    with _lock:
+        lines = [line for metric in METRICS for line in metric.expose()]
+    return "\n".join(lines) + "\n"
+
+
+class PerformanceMiddleware:
+    """
+    Measure requests to the todo views (see the module docstring).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PERFORMANCE_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics, token = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics, token = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def start(self):
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        metrics = RequestMetrics()
+        return metrics, _current.set(metrics)
+
+    def finish(self, request, response, metrics):
+        match = request.resolver_match
+        if match is None:
+            return response
+        view_func = getattr(match.func, "view_class", match.func)
+        if view_func.__module__ not in INSTRUMENTED_MODULES:
+            return response
+
+        total = time.perf_counter() - metrics.start
+        size = None if response.streaming else len(response.content)
+        observe(match.view_name, request.method, response.status_code, metrics, total, size)
+
+        if settings.DEBUG or is_internal(request):
+            response["Server-Timing"] = self.server_timing(metrics, total)
+
+        if total * 1000 >= settings.SLOW_REQUEST_THRESHOLD_MS:
+            self.log_slow_request(request, response, metrics, total)
+        return response
+
+    def server_timing(self, metrics, total):
+        timings = [
+            f"total;dur={total * 1000:.1f}",
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{len(metrics.queries)} queries"',
+        ]
+        timings += [
+            f"{name};dur={duration * 1000:.1f}" for name, duration in metrics.timings.items()
+        ]
+        return ", ".join(timings)
+
+    def log_slow_request(self, request, response, metrics, total):
+        queries = "".join(
+            f"\n  {duration * 1000:.1f} ms  {sql[:MAX_LOGGED_SQL_LENGTH]}"
+            for sql, duration in metrics.queries[:MAX_LOGGED_QUERIES]
+        )
+        if len(metrics.queries) > MAX_LOGGED_QUERIES:
+            queries += f"\n  ... {len(metrics.queries) - MAX_LOGGED_QUERIES} more"
+        logger.warning(
+            "Slow request: %s %s -> %s in %.1f ms, %d queries in %.1f ms%s",
+            request.method,
+            request.get_full_path(),
+            response.status_code,
+            total * 1000,
+            len(metrics.queries),
+            metrics.db_time * 1000,
+            queries,
+        )
+
+
+def is_internal(request):
+    return request.META.get("REMOTE_ADDR") in settings.INTERNAL_IPS
+
+
+def metrics_view(request):
+    """
+    Serve the metrics to Prometheus. Only reachable from INTERNAL_IPS.
+    """
+    if not settings.PERFORMANCE_INSTRUMENTATION or not is_internal(request):
+        raise Http404
+    return HttpResponse(expose_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
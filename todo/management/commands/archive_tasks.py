@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from todo.archive import archive_done_tasks
+
+
+class Command(BaseCommand):
+    help = "Move done tasks that have not changed for a while to the archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.TASK_ARCHIVE_AFTER_DAYS,
+            help="Archive done tasks unchanged for DAYS days (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Tasks moved per transaction (default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        archived = archive_done_tasks(
+            older_than=timedelta(days=options["days"]), batch_size=options["batch_size"]
+        )
+        self.stdout.write(f"Archived {archived} tasks.")
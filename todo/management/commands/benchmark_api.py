@@ -0,0 +1,100 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from todo import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the task API: seed benchmark users, tasks and tags, send "
+        "concurrent list, detail, create, update, bulk update and analytics requests "
+        "and report throughput, latency percentiles and queries per request. "
+        "Requests go through Django's test client, or over HTTP to a running "
+        "server with --client http. Results can be saved as a baseline, and "
+        "compared to one to catch regressions. The benchmark users are "
+        "deleted afterwards unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1, help="Users to seed (default: %(default)s).")
+        parser.add_argument("--tasks", type=int, default=1000, help="Tasks per user (default: %(default)s).")
+        parser.add_argument("--tags", type=int, default=20, help="Tags to seed (default: %(default)s).")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per scenario (default: %(default)s).")
+        parser.add_argument("--concurrency", type=int, default=10, help="Requests in flight (default: %(default)s).")
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=list(benchmark.SCENARIOS),
+            help="Scenario to run; repeat for several (default: all).",
+        )
+        parser.add_argument(
+            "--client", choices=["test", "http"], default="test", help="Request driver (default: %(default)s)."
+        )
+        parser.add_argument(
+            "--url",
+            default="http://127.0.0.1:8000",
+            help="Server to send requests to with --client http (default: %(default)s).",
+        )
+        parser.add_argument("--save-baseline", metavar="PATH", help="Write the results to this JSON file.")
+        parser.add_argument("--baseline", metavar="PATH", help="Fail if the results regress from this JSON file.")
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Allowed p50 latency increase over the baseline, as a fraction (default: %(default)s).",
+        )
+        parser.add_argument("--keep", action="store_true", help="Keep the seeded users, tasks and tags.")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            try:
+                with open(options["baseline"]) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read baseline: {exc}")
+
+        # the test client sends requests for the "testserver" host
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            results = self.benchmark(options)
+
+        if options["save_baseline"]:
+            with open(options["save_baseline"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Baseline saved to {options['save_baseline']}.")
+
+        if baseline is not None:
+            regressions = benchmark.compare(results, baseline, options["tolerance"])
+            if regressions:
+                raise CommandError("Regressions:\n  " + "\n  ".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions from the baseline."))
+
+    def benchmark(self, options):
+        start = time.perf_counter()
+        users, tag_names = benchmark.seed(options["users"], options["tasks"], options["tags"])
+        self.stdout.write(
+            f"Seeded {options['users']} x {options['tasks']} tasks in {time.perf_counter() - start:.1f}s."
+        )
+        results = {}
+        try:
+            contexts = [benchmark.scenario_context(user, tag_names, seed=n) for n, user in enumerate(users)]
+            for scenario in options["scenario"] or benchmark.SCENARIOS:
+                if options["client"] == "http":
+                    summary = benchmark.run_http(
+                        scenario, contexts, options["requests"], options["concurrency"], options["url"]
+                    )
+                else:
+                    summary = benchmark.run_test_client(
+                        scenario, contexts, options["requests"], options["concurrency"]
+                    )
+                results[scenario] = summary
+                self.stdout.write(benchmark.format_summary(scenario, summary))
+        finally:
+            if not options["keep"]:
+                benchmark.cleanup(users, tag_names)
+        return results
+
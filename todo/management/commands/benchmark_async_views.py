@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from todo import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput and latency of the WSGI (DRF) and ASGI (async) "
+        "task list, detail and analytics views under concurrent load. "
+        "Requests go through Django's in-process test clients against the "
+        "configured database, using a temporary user that is deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=200, help="Tasks to seed (default: %(default)s).")
+        parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint (default: %(default)s).")
+        parser.add_argument("--concurrency", type=int, default=50, help="Requests in flight (default: %(default)s).")
+
+    def handle(self, *args, **options):
+        # the test clients send requests for the "testserver" host
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            self.benchmark(options)
+
+    def benchmark(self, options):
+        users, tag_names = benchmark.seed(tasks=options["tasks"])
+        try:
+            contexts = [benchmark.scenario_context(users[0], tag_names)]
+            for scenario in benchmark.ASYNC_SCENARIOS:
+                self.stdout.write(f"{scenario}:")
+                for label, run in [("wsgi", benchmark.run_test_client), ("asgi", benchmark.run_async_client)]:
+                    summary = run(scenario, contexts, options["requests"], options["concurrency"])
+                    self.stdout.write("  " + benchmark.format_summary(label, summary))
+        finally:
+            benchmark.cleanup(users, tag_names)
@@ -0,0 +1,83 @@
+import io
+import uuid
+from datetime import datetime, timedelta
+from datetime import time as time_of_day
+from datetime import timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from todo import benchmark, renderers
+from todo.renderers import FastJSONParser, FastJSONRenderer
+
+
+def task_payloads(count):
+    """
+    Build a serialized task list page (strings only, as TaskSerializer
+    returns it) and the same tasks with native UUID, datetime, time and
+    duration values.
+    """
+    now = datetime.now(dt_timezone.utc)
+    native = [
+        {
+            "id": uuid.uuid4(),
+            "user": "benchmark",
+            "tags": ["work", "urgent", "home"][: i % 4],
+            "title": f"Task {i}",
+            "description": "Write the quarterly report and send it to the team." if i % 2 else None,
+            "status": ("pending", "in_progress", "done")[i % 3],
+            "priority": ("low", "medium", "high")[i % 3],
+            "recurrence": "none",
+            "recurrence_end": None,
+            "due_date": now + timedelta(days=i % 30),
+            "start_time": time_of_day(9, i % 60),
+            "end_time": None,
+            "time_spent": timedelta(minutes=i % 240, microseconds=i),
+            "created_at": now - timedelta(seconds=i),
+            "updated_at": now,
+            "previous_occurrence": None,
+        }
+        for i in range(count)
+    ]
+    serialized = [
+        {key: value if isinstance(value, (str, list, type(None))) else str(value) for key, value in task.items()}
+        for task in native
+    ]
+    return {"next": None, "previous": None, "results": serialized}, {"results": native}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare DRF's JSONRenderer and JSONParser with todo.renderers' "
+        "FastJSONRenderer and FastJSONParser on task list payloads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=1000, help="Tasks per payload (default: %(default)s).")
+        parser.add_argument("--rounds", type=int, default=20, help="Timed rounds per case (default: %(default)s).")
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            self.stdout.write("orjson is not installed: the fast classes use the stdlib fallback.")
+
+        serialized, native = task_payloads(options["tasks"])
+        rounds = options["rounds"]
+
+        for label, payload in [("serialized page", serialized), ("native values", native)]:
+            body = JSONRenderer().render(payload)
+            if FastJSONRenderer().render(payload) != body:
+                raise CommandError(f"FastJSONRenderer output differs for the {label}.")
+            self.stdout.write(f"{label}, {options['tasks']} tasks, {len(body) / 1024:.0f} KiB:")
+            self.report("render", benchmark.best_of(lambda: JSONRenderer().render(payload), rounds),
+                        benchmark.best_of(lambda: FastJSONRenderer().render(payload), rounds))
+
+        body = JSONRenderer().render(serialized)
+        self.stdout.write("parse serialized page:")
+        self.report("parse", benchmark.best_of(lambda: JSONParser().parse(io.BytesIO(body)), rounds),
+                    benchmark.best_of(lambda: FastJSONParser().parse(io.BytesIO(body)), rounds))
+
+    def report(self, action, baseline, fast):
+        self.stdout.write(f"  drf  {action} {baseline * 1000:8.2f} ms")
+        self.stdout.write(f"  fast {action} {fast * 1000:8.2f} ms   ({baseline / fast:.1f}x)")
+
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from todo import benchmark
+from todo.fastpath import render_tasks, task_rows
+from todo.models import Task
+from todo.serializers import TaskSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare fetching and rendering a user's tasks with TaskSerializer "
+        "against the todo.fastpath values() renderer, and check that both "
+        "produce the same JSON. Uses a temporary user that is deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=10_000, help="Tasks to seed (default: %(default)s).")
+        parser.add_argument("--rounds", type=int, default=5, help="Timed rounds per path (default: %(default)s).")
+
+    def handle(self, *args, **options):
+        users, tag_names = benchmark.seed(tasks=options["tasks"], tags=3, tags_per_task=3)
+        try:
+            queryset = Task.objects.filter(user=users[0]).order_by("-created_at", "-id")
+
+            def serializer_path():
+                return JSONRenderer().render(TaskSerializer(queryset.with_related(), many=True).data)
+
+            def fast_path():
+                return JSONRenderer().render(render_tasks(task_rows(queryset)))
+
+            if serializer_path() != fast_path():
+                raise CommandError("The fast path output differs from TaskSerializer's.")
+
+            baseline = benchmark.best_of(serializer_path, options["rounds"])
+            fast = benchmark.best_of(fast_path, options["rounds"])
+            self.stdout.write(f"{options['tasks']} tasks, best of {options['rounds']} rounds:")
+            self.stdout.write(f"  serializer {baseline * 1000:8.1f} ms")
+            self.stdout.write(f"  fastpath   {fast * 1000:8.1f} ms   ({baseline / fast:.1f}x)")
+        finally:
+            benchmark.cleanup(users, tag_names)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from todo.recurrence import generate_next_occurrences
+
+
+class Command(BaseCommand):
+    help = "Create the next occurrence of every recurring task that is due for one."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Tasks processed per batch (default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        created = generate_next_occurrences(batch_size=options["batch_size"])
+        self.stdout.write(f"Created {created} recurring tasks.")
@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from todo.importers import FORMATS, TaskImporter
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Import tasks for a user from a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import.")
+        parser.add_argument("--user", required=True, help="Email of the user to import the tasks for.")
+        parser.add_argument(
+            "--input",
+            choices=FORMATS,
+            help="File format (default: taken from the file extension).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows validated and inserted per batch (default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['user']!r}.")
+
+        input_format = options["input"] or options["path"].rpartition(".")[2].lower()
+        if input_format not in FORMATS:
+            raise CommandError("Cannot tell the file format; pass --input.")
+
+        importer = TaskImporter(user, batch_size=options["batch_size"], max_errors=None)
+        with open(options["path"], encoding="utf-8-sig", newline="") as stream:
+            importer.run(stream, input_format)
+
+        for error in importer.errors:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        self.stdout.write(f"Created {importer.created} tasks, {importer.failed} rows failed.")
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from todo.models import TaskTombstone
+
+
+class Command(BaseCommand):
+    help = "Delete task tombstones older than the sync retention period."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=TaskTombstone.RETENTION.days,
+            help="Keep tombstones from the last DAYS days (default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        deleted, _ = TaskTombstone.objects.prune(timedelta(days=options["days"]))
+        self.stdout.write(f"Deleted {deleted} task tombstones.")
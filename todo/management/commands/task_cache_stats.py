@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from todo.cache import PAGE_CACHE_TIMEOUT, get_cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Show hit and miss counts of the task list and detail page cache, "
+        "to help tune its timeout."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Reset the counters afterwards.")
+
+    def handle(self, *args, **options):
+        stats = get_cache_stats()
+        ratio = "n/a" if stats["hit_ratio"] is None else f"{stats['hit_ratio']:.1%}"
+        self.stdout.write(
+            f"hits {stats['hits']}   misses {stats['misses']}   hit ratio {ratio}   "
+            f"timeout {PAGE_CACHE_TIMEOUT}s"
+        )
+        if options["reset"]:
+            reset_cache_stats()
+            self.stdout.write("Counters reset.")
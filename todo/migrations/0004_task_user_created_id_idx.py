@@ -0,0 +1,21 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todo", "0003_alter_task_tags"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["user", "created_at", "id"], name="task_user_created_id_idx"
+            ),
+        ),
+    ]
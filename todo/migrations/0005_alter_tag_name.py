@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todo", "0004_task_user_created_id_idx"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="tag",
+            name="name",
+            field=models.CharField(max_length=255, unique=True),
+        ),
+    ]
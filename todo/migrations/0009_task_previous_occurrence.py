@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todo", "0008_task_tombstone"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="previous_occurrence",
+            field=models.OneToOneField(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="next_occurrence",
+                to="todo.task",
+            ),
+        ),
+    ]
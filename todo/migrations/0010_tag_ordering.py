@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:55
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todo", "0009_task_previous_occurrence"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="tag",
+            options={"ordering": ["name"]},
+        ),
+    ]
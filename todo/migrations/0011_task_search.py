@@ -0,0 +1,102 @@
+from django.db import migrations
+
+# FTS5 index of task titles and descriptions on SQLite, kept in sync by
+# triggers so that bulk writes (which send no signals) are indexed too.
+# FTS5 rows are keyed by an integer rowid; todo_task_search_rowid maps
+# them to task ids.
+SQLITE_CREATE = [
+    """
+    CREATE VIRTUAL TABLE todo_task_search USING fts5(
+        user_id, title, description, tokenize = "porter unicode61"
+    )
+    """,
+    """
+    CREATE TABLE todo_task_search_rowid (
+        rowid INTEGER PRIMARY KEY,
+        task_id char(32) NOT NULL UNIQUE
+    )
+    """,
+    """
+    INSERT INTO todo_task_search_rowid (task_id) SELECT id FROM todo_task
+    """,
+    """
+    INSERT INTO todo_task_search (rowid, user_id, title, description)
+    SELECT ids.rowid, task.user_id, task.title, COALESCE(task.description, '')
+    FROM todo_task AS task
+    JOIN todo_task_search_rowid AS ids ON ids.task_id = task.id
+    """,
+    """
+    CREATE TRIGGER todo_task_search_insert AFTER INSERT ON todo_task BEGIN
+        INSERT INTO todo_task_search_rowid (task_id) VALUES (new.id);
+        INSERT INTO todo_task_search (rowid, user_id, title, description)
+        VALUES (last_insert_rowid(), new.user_id, new.title, COALESCE(new.description, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER todo_task_search_update AFTER UPDATE OF user_id, title, description ON todo_task
+    WHEN old.user_id IS NOT new.user_id
+        OR old.title IS NOT new.title
+        OR old.description IS NOT new.description
+    BEGIN
+        UPDATE todo_task_search
+        SET user_id = new.user_id, title = new.title, description = COALESCE(new.description, '')
+        WHERE rowid = (SELECT rowid FROM todo_task_search_rowid WHERE task_id = old.id);
+    END
+    """,
+    """
+    CREATE TRIGGER todo_task_search_delete AFTER DELETE ON todo_task BEGIN
+        DELETE FROM todo_task_search
+        WHERE rowid = (SELECT rowid FROM todo_task_search_rowid WHERE task_id = old.id);
+        DELETE FROM todo_task_search_rowid WHERE task_id = old.id;
+    END
+    """,
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS todo_task_search_delete",
+    "DROP TRIGGER IF EXISTS todo_task_search_update",
+    "DROP TRIGGER IF EXISTS todo_task_search_insert",
+    "DROP TABLE IF EXISTS todo_task_search_rowid",
+    "DROP TABLE IF EXISTS todo_task_search",
+]
+
+
+def postgresql_index():
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    # must stay identical to todo.search.search_vector()
+    vector = (
+        SearchVector("title", weight="A", config="english")
+        + SearchVector("description", weight="B", config="english")
+    )
+    return GinIndex(vector, name="task_search_idx")
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.add_index(apps.get_model("todo", "Task"), postgresql_index())
+    elif vendor == "sqlite":
+        for statement in SQLITE_CREATE:
+            schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.remove_index(apps.get_model("todo", "Task"), postgresql_index())
+    elif vendor == "sqlite":
+        for statement in SQLITE_DROP:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todo", "0010_tag_ordering"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
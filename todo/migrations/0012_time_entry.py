@@ -0,0 +1,29 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:18
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todo", "0011_task_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TimeEntry",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("started_at", models.DateTimeField()),
+                ("ended_at", models.DateTimeField(blank=True, null=True)),
+                ("duration", models.DurationField(blank=True, null=True)),
+                ("task", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="time_entries", to="todo.task")),
+            ],
+            options={
+                "indexes": [models.Index(fields=["task", "started_at"], name="timeentry_task_started_idx")],
+                "constraints": [models.UniqueConstraint(condition=models.Q(("ended_at__isnull", True)), fields=("task",), name="timeentry_one_running_per_task")],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:34
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todo", "0013_task_history"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedTask",
+            fields=[
+                ("id", models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ("title", models.CharField(max_length=255)),
+                ("description", models.TextField(blank=True, null=True)),
+                ("status", models.CharField(choices=[("pending", "Pending"), ("in_progress", "In Progress"), ("done", "Done")], max_length=15)),
+                ("priority", models.CharField(choices=[("low", "Low"), ("medium", "Medium"), ("high", "High")], max_length=15)),
+                ("recurrence", models.CharField(choices=[("none", "None"), ("daily", "Daily"), ("weekly", "Weekly"), ("monthly", "Monthly")], max_length=15)),
+                ("recurrence_end", models.DateTimeField(blank=True, null=True)),
+                ("due_date", models.DateTimeField(blank=True, null=True)),
+                ("start_time", models.TimeField(blank=True, null=True)),
+                ("end_time", models.TimeField(blank=True, null=True)),
+                ("time_spent", models.DurationField(blank=True, null=True)),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                ("tags", models.JSONField(blank=True, default=list)),
+                ("time_entries", models.JSONField(blank=True, default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ("next_occurrence_id", models.UUIDField(blank=True, null=True)),
+                ("archived_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(condition=models.Q(("status", "done")), fields=["updated_at"], name="task_done_updated_idx"),
+        ),
+        migrations.AddField(
+            model_name="archivedtask",
+            name="user",
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="archived_tasks", to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name="archivedtask",
+            index=models.Index(fields=["user", "archived_at", "id"], name="archived_user_archived_idx"),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:46
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_generated(apps, schema_editor):
+    # tasks whose next occurrence exists were generated before the column
+    now = timezone.now()
+    Task = apps.get_model("todo", "Task")
+    Task.objects.filter(next_occurrence__isnull=False).update(recurrence_generated_at=now)
+    ArchivedTask = apps.get_model("todo", "ArchivedTask")
+    ArchivedTask.objects.filter(next_occurrence_id__isnull=False).update(recurrence_generated_at=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todo", "0014_archived_task"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="archivedtask",
+            name="recurrence_generated_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="recurrence_generated_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(mark_generated, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:50
+
+from importlib import import_module
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_sequences(apps, schema_editor):
+    # existing changes keep sequence number 0; the rows let pruning their
+    # tombstones expire the sync tokens that predate it
+    TaskSequence = apps.get_model("todo", "TaskSequence")
+    TaskTombstone = apps.get_model("todo", "TaskTombstone")
+    TaskSequence.objects.bulk_create([
+        TaskSequence(user_id=user_id)
+        for user_id in TaskTombstone.objects.values_list("user_id", flat=True).distinct()
+    ])
+
+
+def restore_search_triggers(apps, schema_editor):
+    # SQLite rebuilds todo_task to add (or remove) a NOT NULL column, which
+    # drops the search index triggers of 0011_task_search
+    if schema_editor.connection.vendor == "sqlite":
+        search = import_module("todo.migrations.0011_task_search")
+        for statement in search.SQLITE_CREATE:
+            if statement.strip().startswith("CREATE TRIGGER"):
+                schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0002_alter_customuser_email"),
+        ("todo", "0015_task_recurrence_generated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.CreateModel(
+            name="TaskSequence",
+            fields=[
+                ("user", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name="task_sequence", serialize=False, to=settings.AUTH_USER_MODEL)),
+                ("value", models.BigIntegerField(default=0)),
+                ("pruned_seq", models.BigIntegerField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name="tasktombstone",
+            name="tombstone_user_deleted_idx",
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="change_seq",
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="tasktombstone",
+            name="change_seq",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(fields=["user", "change_seq", "id"], name="task_user_change_seq_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="tasktombstone",
+            index=models.Index(fields=["user", "change_seq", "id"], name="tombstone_user_change_seq_idx"),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+        migrations.RunPython(create_sequences, migrations.RunPython.noop),
+    ]
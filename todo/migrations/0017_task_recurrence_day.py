@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todo", "0016_task_change_seq"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="archivedtask",
+            name="recurrence_day",
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="recurrence_day",
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
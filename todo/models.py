@@ -1,11 +1,95 @@
+import threading
 import uuid
-from django.db import models
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models, router, transaction
 from django.contrib.auth import get_user_model
 
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
 
 User = get_user_model()
 
+
+class TagIdCache:
+    """
+    A small thread-safe LRU cache mapping tag names to tag ids.
+
+    Tags are never renamed through the API, so the only invalidation needed
+    is when a tag is deleted or changed (see todo.signals).
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, names):
+        found = {}
+        with self._lock:
+            for name in names:
+                if name in self._data:
+                    self._data.move_to_end(name)
+                    found[name] = self._data[name]
+        return found
+
+    def set_many(self, mapping):
+        with self._lock:
+            for name, tag_id in mapping.items():
+                self._data[name] = tag_id
+                self._data.move_to_end(name)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, tag_id):
+        with self._lock:
+            for name in [name for name, value in self._data.items() if value == tag_id]:
+                del self._data[name]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+tag_id_cache = TagIdCache()
+
+
+class TagQuerySet(models.QuerySet):
+    """
+    QuerySet for tags.
+    """
+
+    def resolve_ids(self, names):
+        """
+        Return the ids of the tags with the given names, creating any that
+        do not exist yet, in the order the names were given.
+
+        Costs at most three queries however many names are passed: one
+        lookup for the names missing from the cache, one bulk insert for
+        the ones that do not exist and one re-fetch of the inserted rows
+        (ignore_conflicts does not report ids, and a concurrent request may
+        have inserted the same name first).
+        """
+        names = list(dict.fromkeys(names))
+        ids = tag_id_cache.get_many(names)
+        misses = [name for name in names if name not in ids]
+
+        if misses:
+            found = dict(self.filter(name__in=misses).values_list("name", "id"))
+            missing = [name for name in misses if name not in found]
+            if missing:
+                self.bulk_create([Tag(name=name) for name in missing], ignore_conflicts=True)
+                found.update(self.filter(name__in=missing).values_list("name", "id"))
+            # Only cache ids once they are committed, so a rolled back
+            # transaction cannot leave ids of rows that never existed.
+            transaction.on_commit(lambda: tag_id_cache.set_many(found))
+            ids.update(found)
+
+        return [ids[name] for name in names]
+
+
 class Tag(models.Model):
     """
     A model to represent a tag.
@@ -19,9 +103,139 @@ class Tag(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=255, unique=True)
 
+    objects = TagQuerySet.as_manager()
+
+    class Meta:
+        # a task's tags are listed by name
+        ordering = ["name"]
+
     def __str__(self) -> str:
         return self.name
 
+class TaskQuerySet(models.QuerySet):
+    """
+    QuerySet for tasks.
+    """
+
+    def with_related(self):
+        """
+        Load the owner and tags up front so that serializing any number of
+        tasks costs a constant number of queries.
+        """
+        return self.select_related("user").prefetch_related("tags")
+
+    def _number(self, objs):
+        """
+        Give each object the next change sequence number of its owner.
+        """
+        seqs = {}
+        for obj in objs:
+            if obj.user_id not in seqs:
+                seqs[obj.user_id] = next_change_seq(obj.user_id, using=self.db)
+            obj.change_seq = seqs[obj.user_id]
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db, savepoint=False):
+            self._number(objs)
+            return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db, savepoint=False):
+            self._number(objs)
+            return super().bulk_update(objs, [*fields, "change_seq"], *args, **kwargs)
+
+    def update(self, **kwargs):
+        """
+        Update the tasks. Updates that touch updated_at are changes
+        syncing clients have to see, and take a change sequence number
+        per owner.
+        """
+        if "updated_at" not in kwargs or "change_seq" in kwargs:
+            # bulk_update() numbers its objects itself
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db, savepoint=False):
+            rows = 0
+            for user_id in self.order_by().values_list("user_id", flat=True).distinct():
+                rows += super(TaskQuerySet, self.filter(user_id=user_id)).update(
+                    change_seq=next_change_seq(user_id, using=self.db), **kwargs
+                )
+            return rows
+
+    update.alters_data = True
+
+    def delete(self):
+        """
+        Delete the tasks, leaving a tombstone for each so that syncing
+        clients find out about the deletion.
+        """
+        with transaction.atomic(using=self.db):
+            tombstones = [
+                TaskTombstone(id=pk, user_id=user_id)
+                for pk, user_id in self.values_list("pk", "user_id")
+            ]
+            self._number(tombstones)
+            TaskTombstone.objects.using(self.db).bulk_create(tombstones)
+            return super().delete()
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def analytics(self):
+        """
+        Summarise the tasks in this queryset.
+
+        All counts by status, priority and overdue state come from a single
+        conditional aggregation; the per-tag breakdown needs one grouped
+        query over the tag join.
+        """
+        counts = self.aggregate(**self._analytics_aggregates())
+        return self._analytics_data(counts, list(self._tag_counts()))
+
+    async def aanalytics(self):
+        """
+        Async version of analytics().
+        """
+        counts = await self.aaggregate(**self._analytics_aggregates())
+        return self._analytics_data(counts, [row async for row in self._tag_counts()])
+
+    def _analytics_aggregates(self):
+        now = timezone.now()
+        return {
+            "total_tasks": models.Count("id"),
+            "completed_tasks": models.Count("id", filter=models.Q(status="done")),
+            "pending_tasks": models.Count("id", filter=models.Q(status="pending")),
+            "in_progress_tasks": models.Count("id", filter=models.Q(status="in_progress")),
+            "overdue_tasks": models.Count(
+                "id", filter=models.Q(due_date__lt=now) & ~models.Q(status="done")
+            ),
+            **{
+                f"priority_{value}": models.Count("id", filter=models.Q(priority=value))
+                for value, _ in Task.PRIORITY_CHOICES
+            },
+        }
+
+    def _tag_counts(self):
+        return (
+            self.filter(tags__isnull=False)
+            .values_list("tags__name")
+            .annotate(count=models.Count("id"))
+            .order_by("tags__name")
+        )
+
+    @staticmethod
+    def _analytics_data(counts, tag_counts):
+        data = {
+            key: value for key, value in counts.items() if not key.startswith("priority_")
+        }
+        data["priority"] = {
+            value: counts[f"priority_{value}"] for value, _ in Task.PRIORITY_CHOICES
+        }
+        data["tags"] = dict(tag_counts)
+        return data
+
+
 class Task(models.Model):
     """
     A model to represent a task.
@@ -34,6 +248,7 @@ class Task(models.Model):
         priority: Task priority level (low, medium, high).
         due_date: Date when the task is due.
         created_at: Timestamp when the task was created.
+        updated_at: Timestamp when the task was last changed.
         user: User who created the task.
         recurrence: How often the task repeats (none, daily, weekly).
         recurrence_end: when the recurrrence should stop.
@@ -41,6 +256,13 @@ class Task(models.Model):
         start_time: Time the user started the task.
         tags: tags for the task, a task can have more than one tag.
         end_time: Time the user finished the task.
+        previous_occurrence: The recurring task this task was generated from.
+        recurrence_generated_at: When the task's next occurrence was generated
+            (or found to be past recurrence_end).
+        recurrence_day: Day of the month the monthly series it belongs to
+            falls on.
+        change_seq: Position of the task's last change in the owner's change
+            stream (see TaskSequence).
 
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -99,12 +321,325 @@ class Task(models.Model):
     end_time = models.TimeField(null=True, blank=True)
     time_spent= models.DurationField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # the recurring task this one was generated from (see todo.recurrence)
+    previous_occurrence = models.OneToOneField(
+        "self", null=True, blank=True, editable=False,
+        on_delete=models.SET_NULL, related_name="next_occurrence",
+    )
+    # set once the next occurrence is generated, so that deleting that
+    # occurrence does not make this task due for another one
+    recurrence_generated_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # the day of the month a monthly series was started on, so that
+    # occurrences clamped to shorter months go back to it
+    recurrence_day = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    # position in the owner's change stream (see TaskSequence)
+    change_seq = models.BigIntegerField(default=0, editable=False)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # keyset pagination of a user's tasks on (created_at, id); also
+            # serves (user, created_at) lookups
+            models.Index(fields=["user", "created_at", "id"], name="task_user_created_id_idx"),
+            # incremental sync walks a user's tasks on (change_seq, id)
+            models.Index(fields=["user", "change_seq", "id"], name="task_user_change_seq_idx"),
+            # the task list ETag reads the latest updated_at per user
+            models.Index(fields=["user", "updated_at", "id"], name="task_user_updated_id_idx"),
+            models.Index(fields=["user", "status"], name="task_user_status_idx"),
+            models.Index(fields=["user", "priority"], name="task_user_priority_idx"),
+            models.Index(fields=["user", "due_date"], name="task_user_due_date_idx"),
+            # overdue scans only ever look at unfinished tasks with a due date
+            models.Index(
+                fields=["user", "due_date"],
+                condition=models.Q(due_date__isnull=False) & ~models.Q(status="done"),
+                name="task_user_open_due_idx",
+            ),
+            # the archive job only ever looks at done tasks, oldest first
+            models.Index(
+                fields=["updated_at"],
+                condition=models.Q(status="done"),
+                name="task_done_updated_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        """Save the task under the next change sequence number of its owner."""
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            self.change_seq = next_change_seq(self.user_id, using=using)
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = [*kwargs["update_fields"], "change_seq"]
+            return super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        """Delete the task, leaving a tombstone for syncing clients."""
+        with transaction.atomic():
+            TaskTombstone.objects.create(
+                id=self.pk, user_id=self.user_id, change_seq=next_change_seq(self.user_id)
+            )
+            return super().delete(*args, **kwargs)
+
 
     def is_overdue(self):
         """Check if the task is overdue."""
+        if self.due_date is None:
+            return False
         return self.due_date < timezone.now() and self.status != 'done'
 
+
+
+class TimeEntryQuerySet(models.QuerySet):
+    """
+    QuerySet for time entries.
+    """
+
+    def running(self):
+        return self.filter(ended_at__isnull=True)
+
+    def report(self):
+        """
+        Time spent per task on the finished entries of this queryset, most
+        first, from a single grouped aggregation.
+        """
+        return (
+            self.filter(ended_at__isnull=False)
+            .values("task_id", "task__title")
+            .annotate(time_spent=models.Sum("duration"), sessions=models.Count("id"))
+            .order_by("-time_spent", "task_id")
+        )
+
+
+class TimeEntry(models.Model):
+    """
+    A session of work on a task (see todo.timetracking).
+
+    Entries are appended when tracking starts and only ever changed once,
+    to close them when it stops. The task's time_spent holds the total of
+    its closed entries.
+
+    Attributes:
+        id(UUID): unique identifier for a time entry instance.
+        task: The task worked on.
+        started_at: Timestamp when the session started.
+        ended_at: Timestamp when the session ended, null while it runs.
+        duration: Length of the session, null while it runs.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="time_entries")
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField(null=True, blank=True)
+    duration = models.DurationField(null=True, blank=True)
+
+    objects = TimeEntryQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["task", "started_at"], name="timeentry_task_started_idx"),
+        ]
+        constraints = [
+            # at most one running session per task
+            models.UniqueConstraint(
+                fields=["task"],
+                condition=models.Q(ended_at__isnull=True),
+                name="timeentry_one_running_per_task",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task_id} {self.started_at}"
+
+
+class TaskHistory(models.Model):
+    """
+    A change made to a task, kept as an audit trail (see todo.history).
+
+    Records hold only the fields that changed and outlive the task, so
+    the history of a deleted task can still be read.
+
+    Attributes:
+        id(UUID): unique identifier for a history record.
+        task_id(UUID): id of the changed task.
+        user: User who owns the task.
+        action: What happened to the task (update or delete).
+        changes: The changed fields, as {field: [old value, new value]}.
+        changed_at: Timestamp of the change.
+    """
+
+    ACTION_CHOICES = [
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task_id = models.UUIDField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="task_history")
+    action = models.CharField(max_length=15, choices=ACTION_CHOICES)
+    changes = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["task_id", "changed_at", "id"], name="taskhistory_task_changed_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.task_id}"
+
+
+class TaskTombstoneQuerySet(models.QuerySet):
+    """
+    QuerySet for task tombstones.
+    """
+
+    def prune(self, retention=None):
+        """
+        Delete tombstones older than the retention period, recording the
+        last pruned change of each user so that older sync tokens expire.
+        """
+        retention = retention or TaskTombstone.RETENTION
+        pruned = self.filter(deleted_at__lt=timezone.now() - retention)
+        last_pruned = (
+            pruned.filter(user=models.OuterRef("user")).order_by()
+            .values("user").annotate(last=models.Max("change_seq")).values("last")
+        )
+        with transaction.atomic(using=self.db):
+            TaskSequence.objects.using(self.db).filter(user__in=pruned.values("user")).update(
+                pruned_seq=Greatest(Coalesce("pruned_seq", models.Value(-1)), models.Subquery(last_pruned))
+            )
+            return pruned.delete()
+
+
+class TaskTombstone(models.Model):
+    """
+    A record of a deleted task, kept so that clients syncing changes
+    (see todo.sync) can remove it locally.
+
+    Attributes:
+        id(UUID): id of the deleted task.
+        user: User who owned the task.
+        deleted_at: Timestamp when the task was deleted.
+        change_seq: Position of the deletion in the owner's change stream.
+    """
+
+    # Tombstones older than this are pruned; clients that last synced
+    # before then have to download their tasks again.
+    RETENTION = timedelta(days=30)
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="task_tombstones")
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    change_seq = models.BigIntegerField(default=0)
+
+    objects = TaskTombstoneQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "change_seq", "id"], name="tombstone_user_change_seq_idx"),
+        ]
+
+    def __str__(self):
+        return str(self.id)
+
+
+class TaskSequence(models.Model):
+    """
+    A per-user counter ordering the changes to the user's tasks, for
+    incremental sync (see todo.sync).
+
+    Every task write and deletion takes the next number in the same
+    transaction. Taking it locks the user's row until that transaction
+    ends, so the user's changes commit in sequence order and a client that
+    has seen a number has seen every change before it, whatever the
+    changes' timestamps.
+
+    Attributes:
+        user: User whose changes are counted.
+        value: Last number handed out.
+        pruned_seq: Number of the last pruned tombstone, if any.
+    """
+
+    user = models.OneToOneField(User, primary_key=True, on_delete=models.CASCADE, related_name="task_sequence")
+    value = models.BigIntegerField(default=0)
+    pruned_seq = models.BigIntegerField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.value}"
+
+
+def next_change_seq(user_id, using="default"):
+    """
+    Take the user's next change sequence number. Call it inside the
+    transaction of the change it numbers.
+    """
+    connection = connections[using]
+    table = connection.ops.quote_name(TaskSequence._meta.db_table)
+    user_id = TaskSequence._meta.pk.get_db_prep_value(user_id, connection)
+    with connection.cursor() as cursor:
+        # one statement, so that concurrent first changes cannot both insert
+        cursor.execute(
+            f"INSERT INTO {table} (user_id, value) VALUES (%s, 1) "
+            f"ON CONFLICT (user_id) DO UPDATE SET value = {table}.value + 1 "
+            f"RETURNING value",
+            [user_id],
+        )
+        return cursor.fetchone()[0]
+
+
+class ArchivedTask(models.Model):
+    """
+    A done task moved out of the Task table by the archive job (see
+    todo.archive), so that it no longer weighs on the user's task scans.
+
+    The task keeps its id, and its tags and time entries are kept
+    alongside it so that it can be restored as it was.
+
+    Attributes:
+        id(UUID): id of the archived task.
+        user: User who owns the task.
+        title, description, status, priority, recurrence, recurrence_end,
+        due_date, start_time, end_time, time_spent, created_at, updated_at:
+            The task's fields when it was archived.
+        tags: Names of the task's tags.
+        time_entries: The task's time entries, as
+            [{id, started_at, ended_at, duration}].
+        next_occurrence_id(UUID): The task generated from it, if it is recurring.
+        recurrence_generated_at: When its next occurrence was generated.
+        recurrence_day: Day of the month its monthly series falls on.
+        archived_at: Timestamp when the task was archived.
+    """
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_tasks")
+    title = models.CharField(max_length=255)
+    description = models.TextField(null=True, blank=True)
+    status = models.CharField(max_length=15, choices=Task.STATUS_CHOICES)
+    priority = models.CharField(max_length=15, choices=Task.PRIORITY_CHOICES)
+    recurrence = models.CharField(max_length=15, choices=Task.RECURRING_CHOICES)
+    recurrence_end = models.DateTimeField(null=True, blank=True)
+    due_date = models.DateTimeField(null=True, blank=True)
+    start_time = models.TimeField(null=True, blank=True)
+    end_time = models.TimeField(null=True, blank=True)
+    time_spent = models.DurationField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    tags = models.JSONField(default=list, blank=True)
+    time_entries = models.JSONField(default=list, blank=True, encoder=DjangoJSONEncoder)
+    next_occurrence_id = models.UUIDField(null=True, blank=True)
+    recurrence_generated_at = models.DateTimeField(null=True, blank=True)
+    recurrence_day = models.PositiveSmallIntegerField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # keyset pagination of a user's archive on (archived_at, id)
+            models.Index(fields=["user", "archived_at", "id"], name="archived_user_archived_idx"),
+        ]
+
+    def __str__(self):
+        return self.title
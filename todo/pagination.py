@@ -0,0 +1,295 @@
+import base64
+import binascii
+import uuid
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class TaskCursorPagination(BasePagination):
+    """
+    Keyset (cursor) pagination for tasks, newest first.
+
+    Pages are ordered on (created_at, id) and each cursor encodes the position
+    of the boundary row, so fetching a page is a single index range scan on
+    (user, created_at, id) no matter how deep the client has paged.
+
+    An ordering already applied to the queryset (e.g. by TaskFilter) is used
+    instead, if it is on a single non-null datetime field such as updated_at;
+    id is added as the tie breaker.
+
+    Cursors are opaque base64 strings; clients should only follow the
+    `next` and `previous` links returned in the response.
+
+    Works on querysets of Task instances as well as of .values() rows that
+    include the ordering field and "id".
+    """
+
+    cursor_query_param = "cursor"
+    default_ordering = "-created_at"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    def get_page_queryset(self, queryset, request):
+        """
+        Return the (unevaluated) queryset for the requested page.
+
+        Split from paginate_queryset() so async views can evaluate it with
+        the async ORM and pass the rows to set_page().
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        ordering = queryset.query.order_by[0] if queryset.query.order_by else self.default_ordering
+        self.field = ordering.lstrip("-")
+        descending = ordering.startswith("-")
+
+        cursor = self.decode_cursor(request)
+        self.cursor = cursor
+        if cursor is None:
+            value, pk, self.reverse = None, None, False
+        else:
+            value, pk, self.reverse = cursor
+
+        # walking backwards flips the ordering
+        if descending != self.reverse:
+            queryset = queryset.order_by(f"-{self.field}", "-id")
+            after = "lt"
+        else:
+            queryset = queryset.order_by(self.field, "id")
+            after = "gt"
+        if cursor is not None:
+            queryset = queryset.filter(
+                Q(**{f"{self.field}__{after}": value})
+                | Q(**{self.field: value, f"id__{after}": pk})
+            )
+
+        # Fetch one extra row to find out whether there is another page.
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        """
+        Take the rows fetched with get_page_queryset() and return the page.
+        """
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if self.reverse:
+            results.reverse()
+            self.has_next = self.cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(*self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(*self.get_position(self.page[0]), reverse=True)
+
+    def get_position(self, row):
+        """
+        Return the (ordering field value, id) of a task or a .values() row.
+        """
+        if isinstance(row, dict):
+            return row[self.field], row["id"]
+        return getattr(row, self.field), row.id
+
+    def encode_cursor(self, value, pk, reverse):
+        """
+        Build a link pointing at the page after (or before) the given row.
+        """
+        raw = "|".join([value.isoformat(), pk.hex, "r" if reverse else "f"])
+        encoded = base64.urlsafe_b64encode(raw.encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        """
+        Return (ordering field value, id, reverse) from the request cursor, or None.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode("ascii")).decode("ascii")
+            value, pk, direction = raw.split("|")
+            value = parse_datetime(value)
+            pk = uuid.UUID(hex=pk)
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if value is None or direction not in ("f", "r"):
+            raise NotFound(self.invalid_cursor_message)
+
+        return value, pk, direction == "r"
+
+
+class TaskHistoryPagination(TaskCursorPagination):
+    """
+    Keyset pagination for a task's history, newest change first.
+    """
+
+    default_ordering = "-changed_at"
+
+
+class ArchivedTaskPagination(TaskCursorPagination):
+    """
+    Keyset pagination for archived tasks, most recently archived first.
+    """
+
+    default_ordering = "-archived_at"
+
+
+class TaskSearchPagination(BasePagination):
+    """
+    Page number pagination for ranked search results.
+
+    Search results have no stable keyset to page on, so pages are fetched
+    with LIMIT/OFFSET. No COUNT query is run: one extra row is fetched to
+    find out whether there is a next page.
+    """
+
+    page_query_param = "page"
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    invalid_page_message = "Invalid page."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+        if self.page_number < 1:
+            raise NotFound(self.invalid_page_message)
+
+        offset = (self.page_number - 1) * self.page_size
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        return results[:self.page_size]
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.page_query_param,
+                "required": False,
+                "in": "query",
+                "description": "A page number within the paginated result set.",
+                "schema": {"type": "integer"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.base_url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page_number == 1:
+            return None
+        if self.page_number == 2:
+            return remove_query_param(self.base_url, self.page_query_param)
+        return replace_query_param(self.base_url, self.page_query_param, self.page_number - 1)
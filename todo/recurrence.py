@@ -0,0 +1,162 @@
+import calendar
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .cache import invalidate_user_tasks
+from .models import Task
+
+PERIODS = {
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1),
+}
+
+
+def add_months(value, months, day=None):
+    """
+    Add calendar months to a datetime, on `day` of the month (by default,
+    the datetime's own), clamping it to the end of shorter months (Jan 31
+    + 1 month is Feb 28/29).
+    """
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    day = min(day or value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def monthly_day(due_date, recurrence_day=None):
+    """
+    The day of the month a monthly series falls on.
+
+    `recurrence_day` is the series' original day, kept on its occurrences.
+    It only applies while the due date sits on the last day of a month
+    too short for it: a due date moved to another day starts a new series.
+    """
+    last_day = calendar.monthrange(due_date.year, due_date.month)[1]
+    if recurrence_day and recurrence_day > due_date.day == last_day:
+        return recurrence_day
+    return due_date.day
+
+
+def next_due_date(due_date, recurrence, after, recurrence_day=None):
+    """
+    Return the first occurrence of a recurring task due at `due_date` that
+    is later than both `due_date` and `after`.
+
+    Occurrences missed while the task sat overdue are skipped, not
+    generated one by one; they are counted from the original due date so
+    monthly tasks do not drift. Monthly tasks fall on the series' day (see
+    monthly_day()), so one clamped to Feb 29 is followed by Mar 31.
+    """
+    if recurrence == "monthly":
+        day = monthly_day(due_date, recurrence_day)
+        months = max(1, (after.year - due_date.year) * 12 + after.month - due_date.month)
+        candidate = add_months(due_date, months, day)
+        while candidate <= after:
+            months += 1
+            candidate = add_months(due_date, months, day)
+        return candidate
+
+    period = PERIODS[recurrence]
+    periods = 1
+    if due_date + period <= after:
+        periods = (after - due_date) // period + 1
+    return due_date + periods * period
+
+
+def pending_recurrences(now=None):
+    """
+    Recurring tasks that are done or past due and have not had their next
+    occurrence generated yet.
+    """
+    now = now or timezone.now()
+    return (
+        Task.objects.exclude(recurrence="none")
+        .filter(due_date__isnull=False, recurrence_generated_at__isnull=True)
+        .filter(Q(status="done") | Q(due_date__lte=now))
+        .filter(Q(recurrence_end__isnull=True) | Q(recurrence_end__gt=F("due_date")))
+    )
+
+
+def generate_next_occurrences(tasks=None, now=None, batch_size=500):
+    """
+    Create the next occurrence of every recurring task in `tasks` (by
+    default, all that are due for one) in batches of `batch_size`.
+
+    Each batch costs a constant number of queries: the new tasks are
+    inserted with bulk_create and their tags copied with one bulk insert.
+    Running it again is a no-op: generated tasks are marked with
+    recurrence_generated_at, so they get no other occurrence even if the
+    one generated is deleted, and a task's next occurrence points back to
+    it through a unique column, so a task only ever gets one, even if two
+    runs overlap.
+
+    Returns the number of tasks created.
+    """
+    now = now or timezone.now()
+    tasks = pending_recurrences(now) if tasks is None else tasks
+    tasks = tasks.only(
+        "id", "user", "title", "description", "priority",
+        "recurrence", "recurrence_end", "recurrence_day", "due_date",
+    ).order_by("pk")
+
+    created = 0
+    batch = []
+    for task in tasks.iterator(chunk_size=batch_size):
+        batch.append(task)
+        if len(batch) == batch_size:
+            created += _create_occurrences(batch, now)
+            batch = []
+    if batch:
+        created += _create_occurrences(batch, now)
+    return created
+
+
+def _create_occurrences(tasks, now):
+    occurrences = []
+    for task in tasks:
+        due_date = next_due_date(task.due_date, task.recurrence, now, task.recurrence_day)
+        if task.recurrence_end is not None and due_date > task.recurrence_end:
+            continue
+        if task.recurrence == "monthly":
+            recurrence_day = monthly_day(task.due_date, task.recurrence_day)
+        else:
+            recurrence_day = None
+        occurrences.append(Task(
+            user_id=task.user_id,
+            title=task.title,
+            description=task.description,
+            priority=task.priority,
+            recurrence=task.recurrence,
+            recurrence_end=task.recurrence_end,
+            recurrence_day=recurrence_day,
+            due_date=due_date,
+            previous_occurrence_id=task.pk,
+        ))
+
+    with transaction.atomic():
+        # including the tasks whose recurrence ends before their next occurrence
+        Task.objects.filter(pk__in=[task.pk for task in tasks]).update(recurrence_generated_at=now)
+        if not occurrences:
+            return 0
+
+        Task.objects.bulk_create(occurrences, ignore_conflicts=True)
+        # Another run may have got there first; only keep what was inserted.
+        inserted = dict(
+            Task.objects.filter(pk__in=[task.pk for task in occurrences])
+            .values_list("previous_occurrence_id", "pk")
+        )
+
+        TaskTag = Task.tags.through
+        TaskTag.objects.bulk_create([
+            TaskTag(task_id=inserted[task_id], tag_id=tag_id)
+            for task_id, tag_id in TaskTag.objects.filter(task_id__in=inserted)
+            .values_list("task_id", "tag_id")
+        ])
+
+        for user_id in {task.user_id for task in occurrences if task.previous_occurrence_id in inserted}:
+            invalidate_user_tasks(user_id)
+
+    return len(inserted)
@@ -0,0 +1,89 @@
+"""
+JSON renderer and parser backed by orjson.
+
+orjson encodes UUIDs, datetimes and times natively and is several times
+faster than the stdlib json module DRF uses. Other types (durations,
+decimals, lazy strings...) go through DRF's JSONEncoder, so the output is
+the same as rest_framework.renderers.JSONRenderer's. Without orjson
+installed, or for requests it cannot handle (indented output, non UTF-8
+bodies), both classes fall back to DRF's stdlib implementation.
+
+Enable them in REST_FRAMEWORK's DEFAULT_RENDERER_CLASSES and
+DEFAULT_PARSER_CLASSES.
+"""
+
+import codecs
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+from .instrumentation import timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = encoders.JSONEncoder()
+
+if orjson is not None:
+    # UTC datetimes end in "Z", like DRF's encoder; non-string dict keys
+    # are converted as the stdlib does instead of raising
+    ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(data):
+    """
+    Encode data as compact UTF-8 JSON bytes, as FastJSONRenderer does.
+    """
+    return FastJSONRenderer().render(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer using orjson when available.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed("render"):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if (
+            orjson is None
+            or data is None
+            or not (self.compact and self.ensure_ascii is False and self.strict)
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_encoder.default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # escaped for JavaScript compatibility, as JSONRenderer does
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser using orjson when available.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
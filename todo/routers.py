@@ -0,0 +1,89 @@
+"""
+Read replica routing.
+
+ReplicaRouter sends every write, and by default every read, to the
+primary ("default") database. Reads made inside read_replica() go to one
+of the DATABASE_REPLICAS instead, unless:
+
+    - the user changed a task in the last REPLICA_LAG_SECONDS, so a
+      lagging replica could miss their change (and the page cache would
+      keep the stale result under their new task version), or
+    - a transaction is open on the primary, whose changes replicas cannot
+      see yet.
+
+Views whose reads can tolerate replication lag opt in with the
+replica_reads decorator.
+"""
+
+import functools
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .cache import has_recent_write
+
+_use_replica = ContextVar("todo_use_replica", default=False)
+
+
+@contextmanager
+def read_replica(user_id):
+    """
+    Route the reads made in the block to a replica, unless the user wrote
+    recently.
+    """
+    token = _use_replica.set(_replica_allowed(user_id))
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def _replica_allowed(user_id):
+    return bool(settings.DATABASE_REPLICAS) and not has_recent_write(user_id)
+
+
+def replica_reads(view_method):
+    """
+    Decorate a view's get() (sync or async) to run its reads on a replica
+    (see read_replica()).
+    """
+    if iscoroutinefunction(view_method):
+        @functools.wraps(view_method)
+        async def wrapper(self, request, *args, **kwargs):
+            token = _use_replica.set(await sync_to_async(_replica_allowed)(request.user.pk))
+            try:
+                return await view_method(self, request, *args, **kwargs)
+            finally:
+                _use_replica.reset(token)
+    else:
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            with read_replica(request.user.pk):
+                return view_method(self, request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Route reads inside read_replica() to a random replica, everything else
+    to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,135 @@
+"""
+Full-text search over task titles and descriptions.
+
+On PostgreSQL, tasks are matched against a weighted tsvector of their
+title and description, served by the GIN expression index created in
+migration 0011. On SQLite, migration 0011 creates an FTS5 table
+(todo_task_search) that triggers on todo_task keep in sync with every
+insert, update and delete, including bulk ones; todo_task_search_rowid
+maps its rows to task ids. Other databases fall back to an unindexed
+substring match.
+
+Results are ordered best match first (on SQLite, see MAX_RANKED_MATCHES).
+"""
+
+import re
+import uuid
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Task
+
+# Text search configuration of the PostgreSQL index; changing it (or
+# search_vector()) requires rebuilding the index.
+SEARCH_CONFIG = "english"
+
+# bm25() weights of the FTS5 columns: user_id, title, description.
+FTS_WEIGHTS = (0.0, 10.0, 1.0)
+
+# Ranking costs a few microseconds per match, so on SQLite only this many of
+# the most recently created matching tasks are ranked; older matches follow
+# them, newest first. This keeps searches for very common words fast however
+# many tasks the user has, without dropping any match.
+MAX_RANKED_MATCHES = 5000
+
+# bm25() is only evaluated for the rows at or above the boundary (CASE is
+# evaluated lazily).
+FTS_QUERY = """
+    WITH boundary AS (
+        SELECT COALESCE(MIN(rowid), 0) AS rowid FROM (
+            SELECT rowid FROM todo_task_search WHERE todo_task_search MATCH %s
+            ORDER BY rowid DESC LIMIT %s
+        )
+    )
+    SELECT ids.task_id
+    FROM todo_task_search
+    JOIN todo_task_search_rowid AS ids ON ids.rowid = todo_task_search.rowid
+    CROSS JOIN boundary
+    WHERE todo_task_search MATCH %s
+    ORDER BY
+        todo_task_search.rowid < boundary.rowid,
+        CASE WHEN todo_task_search.rowid >= boundary.rowid THEN bm25(todo_task_search, {weights}) END,
+        todo_task_search.rowid DESC
+    LIMIT %s OFFSET %s
+""".format(weights=", ".join(map(str, FTS_WEIGHTS)))
+
+
+def search_vector():
+    """
+    The tsvector of a task, as indexed by task_search_idx.
+    """
+    from django.contrib.postgres.search import SearchVector
+
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="B", config=SEARCH_CONFIG)
+    )
+
+
+def search_tasks(user, query):
+    """
+    Return the ids of the user's tasks matching `query`, best match first.
+
+    The result is sliceable; only the requested slice is fetched.
+    """
+    if connection.vendor == "postgresql":
+        return _search_postgresql(user, query)
+    if connection.vendor == "sqlite":
+        return FTSResults(user, query)
+
+    tasks = Task.objects.filter(user=user)
+    for term in query.split():
+        tasks = tasks.filter(Q(title__icontains=term) | Q(description__icontains=term))
+    return tasks.order_by("-created_at", "-id").values_list("pk", flat=True)
+
+
+def _search_postgresql(user, query):
+    from django.contrib.postgres.search import SearchQuery, SearchRank
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+    vector = search_vector()
+    return (
+        Task.objects.filter(user=user)
+        .annotate(search=vector, rank=SearchRank(vector, search_query))
+        .filter(search=search_query)
+        .order_by("-rank", "-created_at", "-id")
+        .values_list("pk", flat=True)
+    )
+
+
+class FTSResults:
+    """
+    Ids of the user's tasks matching an FTS5 query, best match first.
+    Slicing runs the query with LIMIT/OFFSET.
+    """
+
+    def __init__(self, user, query):
+        # user_id is matched as stored in todo_task (e.g. UUIDs as hex)
+        user_id = Task._meta.get_field("user").get_db_prep_value(user.pk, connection)
+        self.match = fts_match(user_id, query)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError("FTSResults only supports slicing.")
+        if self.match is None:
+            return []
+
+        start = key.start or 0
+        limit = -1 if key.stop is None else max(key.stop - start, 0)
+        with connection.cursor() as cursor:
+            cursor.execute(FTS_QUERY, [self.match, MAX_RANKED_MATCHES, self.match, limit, start])
+            return [uuid.UUID(task_id) for task_id, in cursor.fetchall()]
+
+
+def fts_match(user_id, query):
+    """
+    Build an FTS5 MATCH expression requiring every word of `query` in the
+    title or description of one of the user's tasks, or None if `query`
+    has no words.
+    """
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return None
+    words = " AND ".join(f'"{term}"' for term in terms)
+    return f'user_id : "{user_id}" AND {{title description}} : ({words})'
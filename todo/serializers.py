@@ -1,7 +1,11 @@
+import uuid
+
+from django.db import transaction
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
-from .models import Task, Tag
+from . import history
+from .models import ArchivedTask, Task, TaskHistory, Tag, TimeEntry
 
 User = get_user_model()
 
@@ -36,6 +40,172 @@ class TagSerializer(serializers.ModelSerializer):
         ]
 
 
+class TagNameField(serializers.SlugRelatedField):
+    """
+    Represents a tag by its name.
+
+    Incoming names are validated but not looked up here; missing tags are
+    created in bulk by TaskSerializer when the task is saved.
+    """
+
+    default_error_messages = {
+        'blank': 'Tag names cannot be blank.',
+        'max_length': 'Tag names cannot be longer than {max_length} characters.',
+        'invalid': 'Invalid value.',
+    }
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('slug_field', 'name')
+        kwargs.setdefault('queryset', Tag.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid')
+        name = data.strip()
+        if not name:
+            self.fail('blank')
+        max_length = Tag._meta.get_field('name').max_length
+        if len(name) > max_length:
+            self.fail('max_length', max_length=max_length)
+        return name
+
+
+def bulk_create_tasks(validated_data):
+    """
+    Create tasks from a list of validated TaskSerializer data, with one
+    insert for the tasks and one for their tag links.
+    Returns the created tasks, without their tags loaded.
+    """
+    tags_data = [item.pop('tags', []) for item in validated_data]
+    tasks = Task.objects.bulk_create([Task(**item) for item in validated_data])
+    bulk_set_tags(dict(zip([task.pk for task in tasks], tags_data)))
+    return tasks
+
+
+def bulk_set_tags(tags_data):
+    """
+    Link tasks to tags, given a mapping of task id to tag names.
+    """
+    names = list(dict.fromkeys(name for tags in tags_data.values() for name in tags))
+    if not names:
+        return
+    tag_ids = dict(zip(names, Tag.objects.resolve_ids(names)))
+
+    TaskTag = Task.tags.through
+    TaskTag.objects.bulk_create([
+        TaskTag(task_id=task_id, tag_id=tag_ids[name])
+        for task_id, tags in tags_data.items()
+        for name in dict.fromkeys(tags)
+    ])
+
+
+class TaskListSerializer(serializers.ListSerializer):
+    """
+    List serializer used by TaskSerializer(many=True) for bulk writes.
+
+    Creates and updates are written with bulk_create/bulk_update and a
+    single bulk insert of tag links, inside one transaction.
+
+    For updates, `instance` is a queryset of the tasks the caller may
+    update and every item must carry the `id` of one of them.
+    """
+
+    def run_validation(self, data=serializers.empty):
+        self._instances = []
+        self._seen_ids = set()
+        return super().run_validation(data)
+
+    def run_child_validation(self, data):
+        if self.instance is None:
+            return super().run_child_validation(data)
+
+        task = self._get_instance_map().get(self._parse_id(data))
+        if task is None:
+            raise serializers.ValidationError({'id': ['Task not found.']})
+        if task.pk in self._seen_ids:
+            raise serializers.ValidationError({'id': ['Duplicate task id.']})
+        if task.is_overdue():
+            raise serializers.ValidationError(
+                {'id': ['Cannot update a task whose due date has passed.']}
+            )
+
+        self.child.instance = task
+        self.child.initial_data = data
+        try:
+            value = super().run_child_validation(data)
+        finally:
+            self.child.instance = None
+        self._instances.append(task)
+        self._seen_ids.add(task.pk)
+        return value
+
+    def _get_instance_map(self):
+        """
+        Fetch every task referenced by the payload in one query.
+        """
+        if not hasattr(self, '_instance_map'):
+            ids = [self._parse_id(item) for item in self.initial_data if isinstance(item, dict)]
+            tasks = self.instance.filter(pk__in=[pk for pk in ids if pk is not None])
+            self._instance_map = {task.pk: task for task in tasks}
+        return self._instance_map
+
+    @staticmethod
+    def _parse_id(data):
+        try:
+            return uuid.UUID(str(data['id']))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @transaction.atomic
+    def create(self, validated_data):
+        return self._refetch(bulk_create_tasks(validated_data))
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        tasks = self._instances
+        fields = set()
+        tags_data = {}
+        changes = {}
+
+        now = timezone.now()
+
+        for task, attrs in zip(tasks, validated_data):
+            tags = attrs.pop('tags', None)
+            if tags is not None:
+                tags_data[task.pk] = tags
+            changes[task.pk] = history.task_changes(task, attrs)
+            for attr, value in attrs.items():
+                setattr(task, attr, value)
+                fields.add(attr)
+            # bulk_update() does not apply auto_now
+            task.updated_at = now
+
+        Task.objects.bulk_update(tasks, sorted(fields | {'updated_at'}))
+        if tags_data:
+            TaskTag = Task.tags.through
+            old_tags = {task_id: [] for task_id in tags_data}
+            for task_id, name in TaskTag.objects.filter(task_id__in=tags_data).values_list(
+                'task_id', 'tag__name'
+            ):
+                old_tags[task_id].append(name)
+            for task_id, tags in tags_data.items():
+                changes[task_id].update(history.tag_changes(old_tags[task_id], tags))
+
+            TaskTag.objects.filter(task_id__in=tags_data).delete()
+            bulk_set_tags(tags_data)
+
+        history.record(tasks[0].user_id, changes)
+        return self._refetch(tasks)
+
+    def _refetch(self, tasks):
+        """
+        Reload the written tasks with their tags, in the original order.
+        """
+        fetched = Task.objects.filter(pk__in=[task.pk for task in tasks]).with_related().in_bulk()
+        return [fetched[task.pk] for task in tasks]
+
+
 class TaskSerializer(serializers.ModelSerializer):
     """
     Serializer for the Task model.
@@ -48,6 +218,7 @@ class TaskSerializer(serializers.ModelSerializer):
         priority: Task priority level (low, medium, high).
         due_date: Date when the task is due.
         created_at: Timestamp when the task was created.
+        updated_at: Timestamp when the task was last changed.
         user: User who created the task.
         recurrence: How often the task repeats (none, daily, weekly).
         recurrence_end: when the recurrrence should stop.
@@ -55,36 +226,41 @@ class TaskSerializer(serializers.ModelSerializer):
         start_time: Time the user started the task.
         tags: tags for the task, a task can have more than one tag.
         end_time: Time the user finished the task.
+        previous_occurrence: The recurring task this task was generated from.
     """
 
     user = serializers.CharField(source='user.username', read_only=True)
 
     # Accept tag names as a list of strings instead of nested objects
-    tags = serializers.SlugRelatedField(
-        many=True,
-        slug_field='name',
-        queryset=Tag.objects.all()
-    )
+    tags = TagNameField(many=True)
 
     class Meta:
         model = Task
-        fields = '__all__'
+        exclude = ['recurrence_generated_at', 'recurrence_day', 'change_seq']
         read_only_fields = [
-            'user', 'created_at', 'time_spent','start_time', 'end_time'
+            'user', 'created_at', 'updated_at', 'time_spent','start_time', 'end_time'
         ]
+        list_serializer_class = TaskListSerializer
     
 
     def validate_due_date(self, value):
         """
-        Check that the due date is not in the past.
+        Check that the due date is not in the past, unless the context
+        allows it (imports of existing tasks).
         """
-        if value < timezone.now():
+        if self.context.get('allow_past_due_date'):
+            return value
+        if value is not None and value < timezone.now():
             raise serializers.ValidationError("Due date cannot be in the past.")
         return value
 
+    @transaction.atomic
     def create(self, validated_data):
         """
         Override create method to handle task and tag creation.
+
+        The tags are linked in the transaction that numbers the task's
+        change (see todo.sync), so syncing clients never see it without them.
         """
         tags_data = validated_data.pop('tags')
         task = Task.objects.create(**validated_data)
@@ -94,28 +270,129 @@ class TaskSerializer(serializers.ModelSerializer):
 
         return task
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """
         Override update method to handle task and tag updates.
+
+        Only the fields whose value changes are written, with a single
+        UPDATE, and tag links are added and removed by diffing the task's
+        current links. Nothing is written if nothing changes.
         """
         tags_data = validated_data.pop('tags', None)
-        instance = super().update(instance, validated_data)
+        changes = history.task_changes(instance, validated_data)
+        for attr in changes:
+            setattr(instance, attr, validated_data[attr])
 
-        if tags_data:
-            # Clear and reassign tags
-            instance.tags.set(self._get_or_create_tags(tags_data))
+        added = removed = ()
+        if tags_data is not None:
+            current = dict(
+                Task.tags.through.objects.filter(task=instance).values_list('tag_id', 'tag__name')
+            )
+            tag_ids = set(self._get_or_create_tags(tags_data))
+            added, removed = tag_ids - current.keys(), current.keys() - tag_ids
+            if added or removed:
+                changes.update(history.tag_changes(current.values(), tags_data))
 
-        return super().update(instance, validated_data)
-    
-       
+        if changes:
+            # bumps updated_at for tag changes too, and sends post_save,
+            # which invalidates the owner's cached tasks
+            instance.save(update_fields=[*(field for field in changes if field != 'tags'), 'updated_at'])
+        if removed:
+            Task.tags.through.objects.filter(task=instance, tag_id__in=removed).delete()
+        if added:
+            Task.tags.through.objects.bulk_create(
+                [Task.tags.through(task=instance, tag_id=tag_id) for tag_id in added]
+            )
+
+        history.record(instance.user_id, {instance.pk: changes})
+        return instance
 
     def _get_or_create_tags(self, tags_data):
         """
         Utility function to either get or create tags from the provided list of tag names.
-        Returns a list of tag objects.
+        Returns a list of tag ids, resolved in bulk.
         """
-        tag_objects = []
-        for tag_name in tags_data:
-            tag, created = Tag.objects.get_or_create(name=tag_name)
-            tag_objects.append(tag)
-        return tag_objects
+        return Tag.objects.resolve_ids(tags_data)
+
+
+class TimeEntrySerializer(serializers.ModelSerializer):
+    """
+    Serializer for the TimeEntry model.
+
+    Fields:
+        id(UUID): unique identifier for a time entry instance.
+        task: The task worked on.
+        started_at: Timestamp when the session started.
+        ended_at: Timestamp when the session ended, null while it runs.
+        duration: Length of the session, null while it runs.
+    """
+
+    class Meta:
+        model = TimeEntry
+        fields = ["id", "task", "started_at", "ended_at", "duration"]
+        read_only_fields = fields
+
+
+class TimeReportParamsSerializer(serializers.Serializer):
+    """
+    Query parameters of the time report: the range sessions started in.
+    """
+
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+
+
+class TaskTimeSerializer(serializers.Serializer):
+    task = serializers.UUIDField()
+    title = serializers.CharField()
+    time_spent = serializers.DurationField()
+    sessions = serializers.IntegerField()
+
+
+class TimeReportSerializer(serializers.Serializer):
+    """
+    Serializer for todo.timetracking.time_report().
+    """
+
+    total_time_spent = serializers.DurationField()
+    tasks = TaskTimeSerializer(many=True)
+
+
+class TaskHistorySerializer(serializers.ModelSerializer):
+    """
+    Serializer for the TaskHistory model.
+
+    Fields:
+        id(UUID): unique identifier for a history record.
+        task_id(UUID): id of the changed task.
+        action: What happened to the task (update or delete).
+        changes: The changed fields, as {field: [old value, new value]}.
+        changed_at: Timestamp of the change.
+    """
+
+    class Meta:
+        model = TaskHistory
+        fields = ["id", "task_id", "action", "changes", "changed_at"]
+        read_only_fields = fields
+
+
+class ArchivedTaskSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the ArchivedTask model.
+
+    Has the fields of TaskSerializer, with the tags as a list of names,
+    and:
+        archived_at: Timestamp when the task was archived.
+    """
+
+    user = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = ArchivedTask
+        fields = [
+            "id", "title", "description", "status", "priority", "due_date",
+            "created_at", "updated_at", "user", "recurrence", "recurrence_end",
+            "time_spent", "start_time", "tags", "end_time", "archived_at",
+        ]
+        read_only_fields = fields
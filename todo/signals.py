@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_user_tasks
+from .instrumentation import install_query_recorder
+from .models import Tag, Task, tag_id_cache
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_id_cache(sender, instance, **kwargs):
+    """
+    Drop a changed or deleted tag from the name -> id cache.
+    """
+    tag_id_cache.discard(instance.pk)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_caches(sender, instance, **kwargs):
+    """
+    Invalidate the owner's cached task data when one of their tasks changes.
+    """
+    invalidate_user_tasks(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Task.tags.through)
+def invalidate_task_tag_caches(sender, instance, action, reverse, **kwargs):
+    """
+    Invalidate the owner's cached task data when a task's tags change.
+    """
+    if not reverse and action in ("post_add", "post_remove", "post_clear"):
+        invalidate_user_tasks(instance.user_id)
+
+
+if settings.PERFORMANCE_INSTRUMENTATION:
+    connection_created.connect(install_query_recorder, dispatch_uid="todo.instrumentation")
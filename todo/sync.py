@@ -0,0 +1,102 @@
+import base64
+import binascii
+import uuid
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import Task, TaskSequence, TaskTombstone
+
+
+class SyncTokenExpired(ValueError):
+    """
+    The sync token is too old to continue from.
+    """
+
+
+def encode_sync_token(seq, pk):
+    """
+    Encode a position in a user's change stream as an opaque token.
+    """
+    raw = f"{seq}|{pk.hex}"
+    return base64.urlsafe_b64encode(raw.encode("ascii")).decode("ascii")
+
+
+def decode_sync_token(token):
+    """
+    Return the (change_seq, id) position encoded in a sync token.
+    Raises SyncTokenExpired for tokens issued before sync positions were
+    sequence numbers, and ValueError if the token is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token.encode("ascii")).decode("ascii")
+        seq, pk = raw.split("|")
+        pk = uuid.UUID(hex=pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid sync token.")
+
+    try:
+        seq = int(seq)
+    except ValueError:
+        # tokens used to hold (updated_at, id) positions
+        if parse_datetime(seq) is not None:
+            raise SyncTokenExpired("Sync token expired.")
+        raise ValueError("Invalid sync token.")
+    if seq < 0:
+        raise ValueError("Invalid sync token.")
+    return seq, pk
+
+
+def is_expired(user, position):
+    """
+    Whether tombstones after the given position may already be pruned.
+    """
+    pruned_seq = TaskSequence.objects.filter(user=user).values_list("pruned_seq", flat=True).first()
+    return pruned_seq is not None and position[0] <= pruned_seq
+
+
+def changes_since(user, position=None, limit=100):
+    """
+    Collect the user's task changes after `position`, oldest first.
+
+    Changes are ordered by the user's change sequence (see TaskSequence)
+    rather than by timestamp: a change is numbered in the transaction that
+    makes it, and the user's changes commit in that order, so one that
+    commits late is never numbered behind a position a client has already
+    passed. Created or updated tasks are found on (change_seq, id) and
+    deletions on the tombstones' (change_seq, id); both are index range
+    scans. At most `limit` changes are returned.
+
+    Returns (tasks, deleted_ids, next_position, has_more), where
+    `next_position` is the position of the last change returned, or
+    `position` itself if there were none.
+    """
+    tasks = Task.objects.filter(user=user).order_by("change_seq", "id")
+    tombstones = TaskTombstone.objects.filter(user=user).order_by("change_seq", "id")
+
+    if position is not None:
+        seq, pk = position
+        tasks = tasks.filter(Q(change_seq__gt=seq) | Q(change_seq=seq, id__gt=pk))
+        tombstones = tombstones.filter(Q(change_seq__gt=seq) | Q(change_seq=seq, id__gt=pk))
+
+    changes = [
+        (task.change_seq, task.pk, task)
+        for task in tasks.with_related()[:limit + 1]
+    ]
+    changes += [
+        (change_seq, pk, None)
+        for change_seq, pk in tombstones.values_list("change_seq", "id")[:limit + 1]
+    ]
+    changes.sort(key=lambda change: change[:2])
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    if changes:
+        next_position = changes[-1][:2]
+    else:
+        next_position = position
+
+    updated = [task for _, _, task in changes if task is not None]
+    deleted = [pk for _, pk, task in changes if task is None]
+    return updated, deleted, next_position, has_more
@@ -0,0 +1,22 @@
+from celery import shared_task
+
+from . import archive
+from .recurrence import generate_next_occurrences
+
+
+@shared_task
+def generate_recurring_tasks():
+    """
+    Create the next occurrence of every recurring task that is due for one.
+    Scheduled by CELERY_BEAT_SCHEDULE.
+    """
+    return generate_next_occurrences()
+
+
+@shared_task
+def archive_done_tasks():
+    """
+    Move done tasks older than TASK_ARCHIVE_AFTER_DAYS to the archive.
+    Scheduled by CELERY_BEAT_SCHEDULE.
+    """
+    return archive.archive_done_tasks()
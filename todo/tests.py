@@ -1,3 +1,1217 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import uuid
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipUnless
+from urllib.parse import urlencode
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import archive, benchmark, renderers, timetracking
+from .cache import get_cache_stats, invalidate_user_tasks
+from .fastpath import render_tasks, task_rows
+from .filters import TaskFilter
+from .instrumentation import install_query_recorder, record_query
+from .models import ArchivedTask, Tag, Task, TaskHistory, TaskTombstone, tag_id_cache
+from .recurrence import generate_next_occurrences, next_due_date
+from .routers import ReplicaRouter, read_replica
+from .renderers import FastJSONParser, FastJSONRenderer
+from .serializers import TaskSerializer, bulk_create_tasks
+from .tasks import generate_recurring_tasks
+
+User = get_user_model()
+
+
+# slow request logs would only clutter the test output
+@override_settings(SLOW_REQUEST_THRESHOLD_MS=60_000)
+class TaskAPITestCase(TestCase):
+    """
+    Shared fixtures for the task API tests.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="tester", email="tester@example.com", password="password123!"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        # cached tag ids must not outlive the test's rolled back rows
+        tag_id_cache.clear()
+        self.addCleanup(tag_id_cache.clear)
+        # so are cached pages and task versions
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def create_tasks(self, count, tags=("work", "urgent")):
+        tag_objects = [Tag.objects.get_or_create(name=name)[0] for name in tags]
+        tasks = []
+        for i in range(count):
+            task = Task.objects.create(user=self.user, title=f"Task {i}")
+            task.tags.set(tag_objects)
+            tasks.append(task)
+        return tasks
+
+
+class TaskQueryCountTests(TaskAPITestCase):
+    """
+    Listing and retrieving tasks must cost a constant number of queries.
+    """
+
+    def assertConstantQueries(self, num, url, sizes=(1, 10)):
+        created = 0
+        for size in sizes:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.create_tasks(size - created)
+            created = size
+            with self.assertNumQueries(num):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_list_query_count(self):
+        # ETag aggregate + exists() + page + tags
+        self.assertConstantQueries(4, reverse("tasks"))
+
+    @override_settings(TASK_FAST_SERIALIZATION=True)
+    def test_fast_list_query_count(self):
+        # ETag aggregate + exists() + page (tag names are gathered by a subquery)
+        self.assertConstantQueries(3, reverse("tasks"))
+
+    def test_detail_query_count(self):
+        task = self.create_tasks(1)[0]
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("task-detail", args=[task.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["user"], "tester")
+        self.assertCountEqual(response.data["tags"], ["work", "urgent"])
+        # bookkeeping fields stay internal
+        self.assertNotIn("change_seq", response.data)
+        self.assertNotIn("recurrence_generated_at", response.data)
+
+
+    def test_update_query_count(self):
+        task = self.create_tasks(1)[0]
+        url = reverse("task-detail", args=[task.pk])
+        # task, savepoint, current tag links, tag ids, change sequence, UPDATE
+        # of the changed fields, removed tag links, release, tags of the response
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(9):
+            response = self.client.put(url, {"title": "Renamed", "tags": ["work"]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["tags"], ["work"])
+
+        # nothing changes, nothing is written (tag ids are now cached)
+        with self.assertNumQueries(5):
+            response = self.client.put(url, {"title": "Renamed", "tags": ["work"]}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_update_only_writes_changed_fields(self):
+        task = self.create_tasks(1)[0]
+        with CaptureQueriesContext(connection) as queries:
+            self.client.put(reverse("task-detail", args=[task.pk]), {"priority": "high"}, format="json")
+        updates = [q["sql"] for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"priority"', updates[0])
+        self.assertNotIn('"title"', updates[0])
+
+
+class TagResolutionTests(TaskAPITestCase):
+    """
+    Tag names are resolved in bulk, whatever their number.
+    """
+
+    def test_resolve_ids_creates_missing_tags(self):
+        existing = Tag.objects.create(name="work")
+        with self.assertNumQueries(3), self.captureOnCommitCallbacks(execute=True):
+            ids = Tag.objects.resolve_ids(["work", "home", "urgent", "work"])
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(ids[0], existing.pk)
+        self.assertEqual(Tag.objects.count(), 3)
+
+        # every name is now cached
+        with self.assertNumQueries(0):
+            self.assertEqual(Tag.objects.resolve_ids(["urgent", "work"]), [ids[2], ids[0]])
+
+    def test_deleted_tag_is_evicted_from_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            tag_id = Tag.objects.resolve_ids(["work"])[0]
+        Tag.objects.get(pk=tag_id).delete()
+        new_id = Tag.objects.resolve_ids(["work"])[0]
+        self.assertNotEqual(new_id, tag_id)
+        self.assertTrue(Tag.objects.filter(pk=new_id).exists())
+
+    def test_create_task_with_many_tags(self):
+        names = [f"tag-{i}" for i in range(20)]
+        response = self.client.post(
+            reverse("tasks"), {"title": "Import", "tags": names}, format="json"
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertCountEqual(response.data["tags"], names)
+
+
+@override_settings(TASK_ANALYTICS_CACHE=True)
+class TaskAnalyticsTests(TaskAPITestCase):
+    """
+    Analytics are aggregated in the database and cached per user.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_analytics(self):
+        tasks = self.create_tasks(3)
+        Task.objects.filter(pk=tasks[0].pk).update(
+            status="done", due_date=timezone.now() - timedelta(days=1)
+        )
+        Task.objects.filter(pk=tasks[1].pk).update(
+            priority="high", due_date=timezone.now() - timedelta(days=1)
+        )
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("task-analytics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total_tasks"], 3)
+        self.assertEqual(response.data["completed_tasks"], 1)
+        self.assertEqual(response.data["pending_tasks"], 2)
+        self.assertEqual(response.data["overdue_tasks"], 1)
+        self.assertEqual(response.data["priority"], {"low": 0, "medium": 2, "high": 1})
+        self.assertEqual(response.data["tags"], {"urgent": 3, "work": 3})
+
+        with self.assertNumQueries(0):
+            self.client.get(reverse("task-analytics"))
+
+    @override_settings(TASK_ANALYTICS_CACHE=False)
+    def test_disabled_without_a_shared_cache(self):
+        self.create_tasks(1)
+        for _ in range(2):
+            with self.assertNumQueries(2):
+                self.client.get(reverse("task-analytics"))
+
+    def test_task_writes_invalidate_analytics(self):
+        self.create_tasks(1)
+        self.client.get(reverse("task-analytics"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_tasks(1, tags=("home",))
+
+        response = self.client.get(reverse("task-analytics"))
+        self.assertEqual(response.data["total_tasks"], 2)
+        self.assertEqual(response.data["tags"]["home"], 1)
+
+
+class BulkTaskTests(TaskAPITestCase):
+    """
+    Bulk create, update and delete endpoints.
+    """
+
+    def test_bulk_create(self):
+        payload = [{"title": f"Task {i}", "tags": ["work", f"tag-{i % 3}"]} for i in range(30)]
+        # savepoint, change sequence, tasks, tag lookup/insert/re-fetch, tag
+        # links, re-fetch with tags
+        with self.assertNumQueries(10):
+            response = self.client.post(reverse("task-bulk"), payload, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual([task["title"] for task in response.data], [item["title"] for item in payload])
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 30)
+        self.assertEqual(Task.tags.through.objects.count(), 60)
+
+    def test_bulk_create_is_all_or_nothing(self):
+        payload = [{"title": "ok", "tags": []}, {"title": "", "tags": []}]
+        response = self.client.post(reverse("task-bulk"), payload, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("title", response.data[1])
+        self.assertFalse(Task.objects.exists())
+
+    def test_bulk_update(self):
+        tasks = self.create_tasks(3)
+        payload = [
+            {"id": str(tasks[0].pk), "status": "done"},
+            {"id": str(tasks[1].pk), "priority": "high", "tags": ["home"]},
+        ]
+        response = self.client.patch(reverse("task-bulk"), payload, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+
+        tasks[0].refresh_from_db()
+        tasks[1].refresh_from_db()
+        self.assertEqual((tasks[0].status, tasks[0].priority), ("done", "medium"))
+        self.assertEqual((tasks[1].status, tasks[1].priority), ("pending", "high"))
+        self.assertCountEqual(tasks[0].tags.values_list("name", flat=True), ["work", "urgent"])
+        self.assertEqual(list(tasks[1].tags.values_list("name", flat=True)), ["home"])
+
+    def test_bulk_update_rejects_other_users_tasks(self):
+        other = User.objects.create_user(username="other", email="other@example.com", password="x")
+        task = Task.objects.create(user=other, title="Not yours")
+        response = self.client.patch(
+            reverse("task-bulk"), [{"id": str(task.pk), "status": "done"}], format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        task.refresh_from_db()
+        self.assertEqual(task.status, "pending")
+
+    def test_bulk_delete(self):
+        tasks = self.create_tasks(2)
+        missing = "not-a-uuid"
+        response = self.client.delete(
+            reverse("task-bulk"), {"task_ids": [str(tasks[0].pk), missing]}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"deleted": [str(tasks[0].pk)], "not_found": [missing]})
+        self.assertEqual(list(Task.objects.values_list("pk", flat=True)), [tasks[1].pk])
+
+
+class TaskIndexTests(TaskAPITestCase):
+    """
+    The per-user task queries are planned on the composite indexes.
+    """
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor == "postgresql":
+            # Tiny test tables would otherwise always be sequentially scanned.
+            with connection.cursor() as cursor:
+                cursor.execute("SET enable_seqscan = off")
+            self.addCleanup(self._reset_seqscan)
+
+    def _reset_seqscan(self):
+        with connection.cursor() as cursor:
+            cursor.execute("RESET enable_seqscan")
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_query_plans(self):
+        self.create_tasks(5)
+        tasks = Task.objects.filter(user=self.user)
+        now = timezone.now()
+
+        self.assertUsesIndex(tasks.filter(status="done"), "task_user_status_idx")
+        self.assertUsesIndex(tasks.filter(priority="high"), "task_user_priority_idx")
+        self.assertUsesIndex(
+            tasks.order_by("-created_at", "-id")[:50], "task_user_created_id_idx"
+        )
+        self.assertUsesIndex(
+            tasks.filter(due_date__gte=now, due_date__lt=now + timedelta(days=7)),
+            "task_user_due_date_idx",
+        )
+        self.assertUsesIndex(
+            tasks.filter(due_date__lt=now).exclude(status="done"), "task_user_open_due_idx"
+        )
+
+
+class TaskFilterTests(TaskAPITestCase):
+    """
+    Filtering and ordering of the task list.
+    """
+
+    def list(self, **params):
+        response = self.client.get(reverse("tasks"), params)
+        self.assertEqual(response.status_code, 200)
+        return [task["title"] for task in response.data["results"]]
+
+    def test_tag_filters(self):
+        tasks = self.create_tasks(3, tags=("work", "workshop", "urgent"))
+        Tag.objects.create(name="home")
+        tasks[1].tags.set(Tag.objects.filter(name="home"))
+
+        self.assertEqual(self.list(tags="work"), ["Task 2", "Task 0"])
+        self.assertEqual(self.list(tags="work,urgent"), ["Task 2", "Task 0"])
+        self.assertEqual(self.list(tags="wor"), [])
+        # matching several tags does not duplicate the task
+        self.assertEqual(self.list(tags_prefix="wor"), ["Task 2", "Task 0"])
+        self.assertEqual(self.list(tags_prefix="ho"), ["Task 1"])
+
+    def test_due_date_filters(self):
+        now = timezone.now()
+        tasks = self.create_tasks(3)
+        Task.objects.filter(pk=tasks[0].pk).update(due_date=now - timedelta(days=1))
+        Task.objects.filter(pk=tasks[1].pk).update(due_date=now + timedelta(days=1), status="done")
+        Task.objects.filter(pk=tasks[2].pk).update(due_date=now + timedelta(days=10))
+
+        self.assertEqual(self.list(overdue="true"), ["Task 0"])
+        self.assertEqual(self.list(overdue="false"), ["Task 2", "Task 1"])
+        self.assertEqual(
+            self.list(due_after=now.isoformat(), due_before=(now + timedelta(days=2)).isoformat()),
+            ["Task 1"],
+        )
+        self.assertEqual(self.list(status="done"), ["Task 1"])
+        self.assertEqual(self.client.get(reverse("tasks"), {"status": "bogus"}).status_code, 400)
+
+    def test_ordering(self):
+        tasks = self.create_tasks(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.filter(pk=tasks[0].pk).update(updated_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(self.list(ordering="created_at"), ["Task 0", "Task 1", "Task 2"])
+        self.assertEqual(self.list(ordering="-updated_at"), ["Task 0", "Task 2", "Task 1"])
+
+        first_page = self.client.get(reverse("tasks"), {"ordering": "-updated_at", "page_size": 2})
+        next_page = self.client.get(first_page.data["next"])
+        self.assertEqual([task["title"] for task in next_page.data["results"]], ["Task 1"])
+
+    def test_query_plan(self):
+        self.create_tasks(2)
+        queryset = TaskFilter(
+            {"tags": "work", "tags_prefix": "ur"}, queryset=Task.objects.filter(user=self.user)
+        ).qs
+        sql = str(queryset.query).upper()
+        self.assertEqual(sql.count("EXISTS"), 2)
+        self.assertNotIn("DISTINCT", sql)
+        self.assertNotIn("JOIN", sql.split("EXISTS")[0])
+
+
+@override_settings(PERFORMANCE_INSTRUMENTATION=True)
+class InstrumentationTests(TaskAPITestCase):
+    """
+    Request timing headers, metrics and slow request logs.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # new connections only get the recorder when the setting is on at
+        # startup
+        if record_query not in connection.execute_wrappers:
+            install_query_recorder(connection)
+            self.addCleanup(connection.execute_wrappers.remove, record_query)
+
+    def test_server_timing(self):
+        self.create_tasks(2)
+        response = self.client.get(reverse("tasks"))
+        timing = response["Server-Timing"]
+        self.assertIn("total;dur=", timing)
+        self.assertIn('desc="4 queries"', timing)
+        self.assertIn("serialize;dur=", timing)
+        self.assertIn("render;dur=", timing)
+
+        # only the todo views are instrumented
+        self.assertNotIn("Server-Timing", self.client.get(reverse("metrics")))
+
+    def test_server_timing_is_internal_only(self):
+        response = self.client.get(reverse("tasks"), REMOTE_ADDR="203.0.113.7")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Server-Timing", response)
+
+        with self.settings(DEBUG=True):
+            response = self.client.get(reverse("tasks"), REMOTE_ADDR="203.0.113.7")
+        self.assertIn("Server-Timing", response)
+
+    def test_metrics(self):
+        self.client.get(reverse("task-analytics"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('todo_requests_total{view="task-analytics",method="GET",status="200"}', body)
+        self.assertIn('todo_request_duration_seconds_bucket{view="task-analytics",le="+Inf"}', body)
+        self.assertIn('todo_response_size_bytes_count{view="task-analytics"}', body)
+
+        response = self.client.get(reverse("metrics"), REMOTE_ADDR="10.1.2.3")
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_request_log(self):
+        with self.assertLogs("todo.performance", "WARNING") as logs:
+            self.client.get(reverse("tasks"))
+        self.assertIn("Slow request: GET /api/tasks/", logs.output[0])
+        self.assertIn('FROM "todo_task" WHERE "todo_task"."user_id"', logs.output[0])
+
+
+class ConditionalRequestTests(TaskAPITestCase):
+    """
+    ETag handling on the task list and detail endpoints.
+    """
+
+    def test_list_not_modified(self):
+        self.create_tasks(2)
+        response = self.client.get(reverse("tasks"))
+        etag = response["ETag"]
+
+        # one aggregate query
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("tasks"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_tasks(1)
+        response = self.client.get(reverse("tasks"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_list_etag_does_not_depend_on_the_cache(self):
+        # writes seen by another worker: this process's cached task version
+        # is never bumped
+        tasks = self.create_tasks(2)
+        etag = self.client.get(reverse("tasks"))["ETag"]
+
+        Task.objects.filter(pk=tasks[0].pk).update(title="Renamed", updated_at=timezone.now())
+        response = self.client.get(reverse("tasks"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        etag = response["ETag"]
+        Task.objects.filter(pk=tasks[1].pk).delete()
+        response = self.client.get(reverse("tasks"), HTTP_IF_NONE_MATCH=etag)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_detail_not_modified(self):
+        task = self.create_tasks(1)[0]
+        url = reverse("task-detail", args=[task.pk])
+        etag = self.client.get(url)["ETag"]
+
+        # only the task row is fetched
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_put_if_match(self):
+        task = self.create_tasks(1)[0]
+        url = reverse("task-detail", args=[task.pk])
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.put(url, {"title": "First"}, format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        # a second writer still holding the old ETag is rejected
+        response = self.client.put(url, {"title": "Second"}, format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        task.refresh_from_db()
+        self.assertEqual(task.title, "First")
+
+
+@override_settings(TASK_PAGE_CACHE=True)
+class TaskPageCacheTests(TaskAPITestCase):
+    """
+    Read-through caching of task list pages and task details.
+    """
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task = self.create_tasks(2)[0]
+
+    def test_list_and_detail_are_cached(self):
+        # only the list ETag is read from the database
+        for url, queries in [(reverse("tasks"), 1), (reverse("task-detail", args=[self.task.pk]), 0)]:
+            first = self.client.get(url)
+            with self.assertNumQueries(queries):
+                second = self.client.get(url)
+            self.assertEqual(second.status_code, 200)
+            self.assertEqual(second.data, first.data)
+            self.assertEqual(second["ETag"], first["ETag"])
+
+        self.assertEqual(get_cache_stats(), {"hits": 2, "misses": 2, "hit_ratio": 0.5})
+
+    def test_filters_are_cached_separately(self):
+        self.client.get(reverse("tasks"))
+        response = self.client.get(reverse("tasks"), {"status": "done"})
+        self.assertEqual(response.data["results"], [])
+
+    def test_writes_invalidate_cached_pages(self):
+        list_url = reverse("tasks")
+        detail_url = reverse("task-detail", args=[self.task.pk])
+        self.client.get(list_url)
+        self.client.get(detail_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(detail_url, {"title": "Renamed"}, format="json")
+        self.assertEqual(self.client.get(detail_url).data["title"], "Renamed")
+        self.assertIn("Renamed", [t["title"] for t in self.client.get(list_url).data["results"]])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.tags.clear()
+        self.assertEqual(self.client.get(detail_url).data["tags"], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(
+                reverse("task-bulk"),
+                {"task_ids": [str(self.task.pk)], "status": "done"},
+                format="json",
+            )
+        self.assertEqual(self.client.get(detail_url).data["status"], "done")
+
+    @override_settings(TASK_PAGE_CACHE=False)
+    def test_disabled_without_a_shared_cache(self):
+        detail_url = reverse("task-detail", args=[self.task.pk])
+        self.client.get(detail_url)
+        # a write seen by another worker, which this process's cache
+        # never hears about
+        Task.objects.filter(pk=self.task.pk).update(title="Renamed")
+        self.assertEqual(self.client.get(detail_url).data["title"], "Renamed")
+        self.assertEqual(get_cache_stats()["hits"] + get_cache_stats()["misses"], 0)
+
+
+class FastPathTests(TaskAPITestCase):
+    """
+    todo.fastpath must render tasks exactly like TaskSerializer.
+    """
+
+    def test_output_matches_serializer(self):
+        tasks = self.create_tasks(3, tags=("zeta", "alpha", "Mid"))
+        tasks[0].tags.clear()
+        Task.objects.filter(pk=tasks[1].pk).update(
+            description="Ünïcode",
+            due_date=timezone.now() + timedelta(days=3),
+            start_time="08:30:00.250000",
+            time_spent=timedelta(hours=2, microseconds=5),
+            previous_occurrence=tasks[2],
+        )
+        queryset = Task.objects.filter(user=self.user).order_by("created_at")
+
+        expected = TaskSerializer(queryset.with_related(), many=True).data
+        actual = render_tasks(task_rows(queryset))
+        self.assertEqual(JSONRenderer().render(actual), JSONRenderer().render(expected))
+        self.assertEqual(actual[1]["tags"], ["Mid", "alpha", "zeta"])
+
+    def test_views_match_serializer(self):
+        self.create_tasks(3)
+        for url in [reverse("tasks"), reverse("task-export"), reverse("task-search") + "?q=task"]:
+            with self.subTest(url=url):
+                expected = b"".join(self.client.get(url))
+                cache.clear()
+                with self.settings(TASK_FAST_SERIALIZATION=True):
+                    self.assertEqual(b"".join(self.client.get(url)), expected)
+                cache.clear()
+
+
+@override_settings(DATABASE_REPLICAS=["replica_0"])
+class ReplicaRouterTests(SimpleTestCase):
+    # not TestCase: its transaction would keep every read on the primary
+    databases = {"default"}
+
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.user_id = uuid.uuid4()
+
+    def test_reads_in_read_replica_go_to_replicas(self):
+        self.assertEqual(self.router.db_for_read(Task), "default")
+        with read_replica(self.user_id):
+            self.assertEqual(self.router.db_for_read(Task), "replica_0")
+            self.assertEqual(self.router.db_for_write(Task), "default")
+        self.assertEqual(self.router.db_for_read(Task), "default")
+
+    def test_recent_writes_pin_reads_to_primary(self):
+        # outside a transaction, on_commit callbacks run straight away
+        invalidate_user_tasks(self.user_id)
+        with read_replica(self.user_id):
+            self.assertEqual(self.router.db_for_read(Task), "default")
+        with read_replica(uuid.uuid4()):
+            self.assertEqual(self.router.db_for_read(Task), "replica_0")
+
+    def test_migrations_only_run_on_primary(self):
+        self.assertTrue(self.router.allow_migrate("default", "todo"))
+        self.assertFalse(self.router.allow_migrate("replica_0", "todo"))
+
+
+class RendererTests(TestCase):
+    """
+    The orjson renderer and parser must behave like DRF's JSON ones.
+    """
+
+    payload = {
+        "id": uuid.uuid4(),
+        "created_at": datetime(2030, 1, 2, 3, 4, 5, 678, tzinfo=dt_timezone.utc),
+        "due_date": datetime(2030, 1, 2, 3, 4, 5, tzinfo=dt_timezone(timedelta(hours=3))),
+        "start_time": time(8, 30, 0, 250000),
+        "time_spent": timedelta(hours=2, microseconds=5),
+        "price": Decimal("1.50"),
+        "title": "Ünïcode \u2028 line",
+        "tags": ("work", "urgent"),
+        1: None,
+    }
+
+    def test_render_matches_drf(self):
+        expected = JSONRenderer().render(self.payload)
+        self.assertEqual(FastJSONRenderer().render(self.payload), expected)
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertEqual(FastJSONRenderer().render(self.payload), expected)
+
+    def test_parse(self):
+        body = FastJSONRenderer().render({"title": "Ünïcode", "tags": ["a"]})
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), {"title": "Ünïcode", "tags": ["a"]})
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b"{"))
+
+
+class TaskSearchTests(TaskAPITestCase):
+    """
+    Full-text search of task titles and descriptions.
+    """
+
+    def search(self, q, **params):
+        return self.client.get(reverse("task-search"), {"q": q, **params})
+
+    def titles(self, response):
+        return [task["title"] for task in response.data["results"]]
+
+    def test_search_ranks_and_scopes_results(self):
+        Task.objects.create(user=self.user, title="Groceries", description="Buy milk and bread")
+        Task.objects.create(user=self.user, title="Milk the cows")
+        Task.objects.create(user=self.user, title="Unrelated")
+        other = User.objects.create_user(username="other", password="password123!")
+        Task.objects.create(user=other, title="Milk")
+
+        response = self.search("milk")
+        self.assertEqual(response.status_code, 200)
+        # title matches rank above description matches
+        self.assertEqual(self.titles(response), ["Milk the cows", "Groceries"])
+        self.assertEqual(self.titles(self.search("buying milk")), ["Groceries"])
+        self.assertEqual(self.search("").status_code, 400)
+
+    def test_index_follows_writes(self):
+        task = self.create_tasks(1)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.filter(pk=task.pk).update(title="Renamed")
+        self.assertEqual(self.titles(self.search("renamed")), ["Renamed"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.filter(pk=task.pk).delete()
+        self.assertEqual(self.titles(self.search("renamed")), [])
+
+    def test_pagination(self):
+        Task.objects.bulk_create(Task(user=self.user, title=f"Report {i}") for i in range(5))
+        first = self.search("report", page_size=2)
+        self.assertEqual(len(first.data["results"]), 2)
+        self.assertIsNone(first.data["previous"])
+
+        last = self.client.get(first.data["next"].replace("page=2", "page=3"))
+        self.assertEqual(len(last.data["results"]), 1)
+        self.assertIsNone(last.data["next"])
+        self.assertEqual(self.search("report", page=0).status_code, 404)
+
+    @skipUnless(connection.vendor == "sqlite", "the ranking cap only applies to SQLite")
+    def test_matches_beyond_the_ranking_cap(self):
+        for title, description in [
+            ("Milk milk milk", None), ("Milk", None), ("Bread", "milk"), ("Groceries", "milk"),
+        ]:
+            Task.objects.create(user=self.user, title=title, description=description)
+
+        with mock.patch("todo.search.MAX_RANKED_MATCHES", 2):
+            titles = self.titles(self.search("milk"))
+            # the newest two are ranked, older matches follow newest first
+            self.assertCountEqual(titles[:2], ["Bread", "Groceries"])
+            self.assertEqual(titles[2:], ["Milk", "Milk milk milk"])
+
+            page = self.search("milk", page_size=1, page=4)
+            self.assertEqual(self.titles(page), ["Milk milk milk"])
+
+
+class TaskChangesTests(TaskAPITestCase):
+    """
+    Incremental sync through /api/tasks/changes/.
+    """
+
+    def sync(self, token=None, page_size=100):
+        params = {"page_size": page_size}
+        if token:
+            params["since"] = token
+        response = self.client.get(reverse("task-changes"), params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_sync_updates_and_deletions(self):
+        tasks = self.create_tasks(3)
+        data = self.sync(page_size=2)
+        self.assertTrue(data["has_more"])
+        data = self.sync(data["next_token"], page_size=2)
+        self.assertFalse(data["has_more"])
+        self.assertEqual(len(data["updated"]), 1)
+        token = data["next_token"]
+
+        # nothing changed: an empty page and the same token back
+        data = self.sync(token)
+        self.assertEqual((data["updated"], data["deleted"]), ([], []))
+        self.assertEqual(data["next_token"], token)
+
+        tasks[0].title = "Renamed"
+        tasks[0].save()
+        self.client.delete(reverse("task-detail", args=[tasks[1].pk]))
+        self.client.delete(reverse("task-bulk"), {"task_ids": [str(tasks[2].pk)]}, format="json")
+
+        data = self.sync(token)
+        self.assertEqual([task["title"] for task in data["updated"]], ["Renamed"])
+        self.assertEqual(data["deleted"], [tasks[1].pk, tasks[2].pk])
+
+    def test_late_commits_are_not_skipped(self):
+        tasks = self.create_tasks(3)
+        token = self.sync()["next_token"]
+
+        # changes committed after the sync by writers whose timestamps are
+        # older than everything the client has seen (a slow transaction,
+        # or another server's clock)
+        past = timezone.now() - timedelta(hours=1)
+        Task.objects.filter(pk=tasks[0].pk).update(title="Late", updated_at=past)
+        deleted_pk = tasks[1].pk
+        tasks[1].delete()
+        TaskTombstone.objects.filter(pk=deleted_pk).update(deleted_at=past)
+
+        data = self.sync(token)
+        self.assertEqual([task["title"] for task in data["updated"]], ["Late"])
+        self.assertEqual(data["deleted"], [deleted_pk])
+
+    def test_invalid_and_expired_tokens(self):
+        response = self.client.get(reverse("task-changes"), {"since": "garbage"})
+        self.assertEqual(response.status_code, 400)
+
+        # a token from when positions were timestamps
+        legacy = base64.urlsafe_b64encode(f"{timezone.now().isoformat()}|{uuid.uuid4().hex}".encode()).decode()
+        response = self.client.get(reverse("task-changes"), {"since": legacy})
+        self.assertEqual(response.status_code, 410)
+
+        tasks = self.create_tasks(2)
+        tasks[0].delete()
+        token = self.sync()["next_token"]
+        tasks[1].delete()
+        TaskTombstone.objects.update(deleted_at=timezone.now() - TaskTombstone.RETENTION * 2)
+        self.assertEqual(TaskTombstone.objects.prune()[0], 2)
+
+        response = self.client.get(reverse("task-changes"), {"since": token})
+        self.assertEqual(response.status_code, 410)
+        # tokens issued after the pruned tombstones still work
+        self.assertEqual(self.sync(self.sync()["next_token"])["updated"], [])
+
+
+class TaskExportTests(TaskAPITestCase):
+    """
+    Streaming export of a user's tasks.
+    """
+
+    def export(self, output):
+        response = self.client.get(reverse("task-export"), {"output": output})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        self.create_tasks(3)
+        lines = self.export("ndjson").splitlines()
+        self.assertEqual([json.loads(line)["title"] for line in lines], ["Task 0", "Task 1", "Task 2"])
+        self.assertCountEqual(json.loads(lines[0])["tags"], ["work", "urgent"])
+
+    def test_export_json(self):
+        self.assertEqual(json.loads(self.export("json")), [])
+        self.create_tasks(2)
+        self.assertEqual(len(json.loads(self.export("json"))), 2)
+
+    def test_export_unknown_output(self):
+        response = self.client.get(reverse("task-export"), {"output": "xml"})
+        self.assertEqual(response.status_code, 400)
+
+
+class TaskImportTests(TaskAPITestCase):
+    """
+    Batched import of tasks from CSV and NDJSON files.
+    """
+
+    def upload(self, name, content, **params):
+        upload = SimpleUploadedFile(name, content.encode())
+        url = reverse("task-import")
+        if params:
+            url += "?" + urlencode(params)
+        return self.client.post(url, {"file": upload}, format="multipart")
+
+    def test_import_csv(self):
+        content = (
+            "title,description,priority,tags\n"
+            "First,,high,work;urgent\n"
+            ",missing title,,\n"
+            "Second,Some details,,\n"
+        )
+        response = self.upload("tasks.csv", content)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data["created"], response.data["failed"]), (2, 1), response.data)
+        self.assertEqual(response.data["errors"][0]["line"], 3)
+
+        first = Task.objects.get(title="First")
+        self.assertEqual(first.priority, "high")
+        self.assertCountEqual(first.tags.values_list("name", flat=True), ["work", "urgent"])
+
+    def test_import_ndjson_in_batches(self):
+        lines = [json.dumps({"title": f"Task {i}", "tags": ["work"]}) for i in range(1200)]
+        lines.insert(10, "not json")
+        response = self.upload("tasks.txt", "\n".join(lines), input="ndjson")
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data["created"], response.data["failed"]), (1200, 1))
+        self.assertEqual(response.data["errors"][0]["line"], 11)
+        self.assertEqual(Task.tags.through.objects.count(), 1200)
+
+    def test_export_round_trip(self):
+        task = self.create_tasks(1)[0]
+        Task.objects.filter(pk=task.pk).update(status="done", due_date=timezone.now() - timedelta(days=30))
+        exported = b"".join(self.client.get(reverse("task-export")).streaming_content).decode()
+        Task.objects.all().delete()
+
+        response = self.upload("tasks.ndjson", exported)
+        self.assertEqual((response.data["created"], response.data["failed"]), (1, 0), response.data)
+        self.assertEqual(Task.objects.get().status, "done")
+
+    def test_write_errors_are_reported_per_row(self):
+        def write(rows):
+            if any(row["title"] == "Bad" for row in rows):
+                raise DatabaseError("rejected")
+            return bulk_create_tasks(rows)
+
+        content = "title\nFirst\nBad\nSecond\n"
+        with mock.patch("todo.importers.bulk_create_tasks", side_effect=write):
+            response = self.upload("tasks.csv", content)
+        self.assertEqual((response.data["created"], response.data["failed"]), (2, 1), response.data)
+        self.assertEqual(response.data["errors"], [{"line": 3, "errors": {"non_field_errors": ["rejected"]}}])
+        self.assertCountEqual(Task.objects.values_list("title", flat=True), ["First", "Second"])
+
+
+class RecurrenceTests(TaskAPITestCase):
+    """
+    Generation of the next occurrence of recurring tasks.
+    """
+
+    def test_next_due_date(self):
+        due = datetime(2024, 1, 31, 9, 0, tzinfo=dt_timezone.utc)
+        self.assertEqual(next_due_date(due, "monthly", due), datetime(2024, 2, 29, 9, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(
+            next_due_date(due, "monthly", datetime(2024, 3, 31, 10, 0, tzinfo=dt_timezone.utc)),
+            datetime(2024, 4, 30, 9, 0, tzinfo=dt_timezone.utc),
+        )
+        self.assertEqual(next_due_date(due, "weekly", due), due + timedelta(weeks=1))
+        # missed occurrences are skipped
+        self.assertEqual(next_due_date(due, "daily", due + timedelta(days=3, hours=1)), due + timedelta(days=4))
+
+    def test_generate_recurring_tasks(self):
+        now = timezone.now()
+        daily = self.create_tasks(1)[0]
+        Task.objects.filter(pk=daily.pk).update(recurrence="daily", due_date=now - timedelta(hours=1))
+        # finished recurrences and tasks not yet due are left alone
+        ended = Task.objects.create(
+            user=self.user, title="Ended", recurrence="weekly",
+            due_date=now - timedelta(days=1), recurrence_end=now - timedelta(days=2),
+        )
+        Task.objects.create(user=self.user, title="Later", recurrence="daily", due_date=now + timedelta(days=1))
+
+        self.assertEqual(generate_recurring_tasks.delay().get(), 1)
+        self.assertEqual(generate_recurring_tasks.delay().get(), 0)
+
+        occurrence = Task.objects.get(previous_occurrence=daily)
+        self.assertEqual(occurrence.status, "pending")
+        self.assertEqual(occurrence.due_date, now - timedelta(hours=1) + timedelta(days=1))
+        self.assertCountEqual(occurrence.tags.values_list("name", flat=True), ["work", "urgent"])
+        self.assertFalse(Task.objects.filter(previous_occurrence=ended).exists())
+
+    def test_monthly_occurrences_keep_their_day(self):
+        due = datetime(2024, 1, 31, 9, 0, tzinfo=dt_timezone.utc)
+        task = Task.objects.create(user=self.user, title="Rent", recurrence="monthly", due_date=due)
+        due_dates = []
+        for _ in range(4):
+            self.assertEqual(generate_next_occurrences(now=task.due_date), 1)
+            task = Task.objects.get(previous_occurrence=task)
+            due_dates.append(task.due_date)
+
+        self.assertEqual(due_dates, [
+            datetime(2024, 2, 29, 9, 0, tzinfo=dt_timezone.utc),
+            datetime(2024, 3, 31, 9, 0, tzinfo=dt_timezone.utc),
+            datetime(2024, 4, 30, 9, 0, tzinfo=dt_timezone.utc),
+            datetime(2024, 5, 31, 9, 0, tzinfo=dt_timezone.utc),
+        ])
+
+    def test_deleted_occurrences_are_not_generated_again(self):
+        task = Task.objects.create(
+            user=self.user, title="Daily", recurrence="daily", due_date=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(generate_recurring_tasks.delay().get(), 1)
+        Task.objects.get(previous_occurrence=task).delete()
+
+        self.assertEqual(generate_recurring_tasks.delay().get(), 0)
+        self.assertEqual(Task.objects.filter(title="Daily").count(), 1)
+
+
+class TimeTrackingTests(TaskAPITestCase):
+    def test_sessions_add_up(self):
+        task = self.create_tasks(1)[0]
+        start = timezone.now()
+        for offset in (0, 2):
+            timetracking.start_tracking(task, now=start + timedelta(hours=offset))
+            timetracking.stop_tracking(task, now=start + timedelta(hours=offset + 1))
+
+        task.refresh_from_db()
+        self.assertEqual(task.time_spent, timedelta(hours=2))
+        self.assertEqual(task.time_entries.count(), 2)
+
+    def test_start_and_stop_endpoints(self):
+        task = self.create_tasks(1)[0]
+        start_url = reverse("task-start", args=[task.pk])
+        stop_url = reverse("task-stop", args=[task.pk])
+
+        self.assertEqual(self.client.post(stop_url).status_code, 400)
+        response = self.client.post(start_url)
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(response.data["ended_at"])
+        self.assertEqual(self.client.post(start_url).status_code, 400)
+
+        response = self.client.post(stop_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.data["duration"])
+        task.refresh_from_db()
+        self.assertIsNotNone(task.time_spent)
+
+    def test_other_users_tasks_cannot_be_tracked(self):
+        other = User.objects.create_user(username="other", email="other@example.com", password="x")
+        task = Task.objects.create(user=other, title="Not mine")
+        self.assertEqual(self.client.post(reverse("task-start", args=[task.pk])).status_code, 404)
+
+    def test_time_report(self):
+        first, second = self.create_tasks(2)
+        start = timezone.now() - timedelta(days=1)
+        for task, hours in ((first, 1), (second, 3), (first, 1)):
+            timetracking.start_tracking(task, now=start)
+            timetracking.stop_tracking(task, now=start + timedelta(hours=hours))
+        timetracking.start_tracking(second, now=start)
+
+        url = reverse("time-report")
+        # one grouped aggregation
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total_time_spent"], "05:00:00")
+        self.assertEqual(
+            [(row["task"], row["time_spent"], row["sessions"]) for row in response.data["tasks"]],
+            [(str(second.pk), "03:00:00", 1), (str(first.pk), "02:00:00", 2)],
+        )
+
+        since = urlencode({"since": timezone.now().isoformat()})
+        self.assertEqual(self.client.get(f"{url}?{since}").data["tasks"], [])
+        self.assertEqual(self.client.get(f"{url}?since=yesterday").status_code, 400)
+
+
+class TaskHistoryTests(TaskAPITestCase):
+    def history(self, task):
+        response = self.client.get(reverse("task-history", args=[task.pk]))
+        self.assertEqual(response.status_code, 200)
+        return [(record["action"], record["changes"]) for record in response.data["results"]]
+
+    def test_update_records_changed_fields(self):
+        task = self.create_tasks(1)[0]
+        url = reverse("task-detail", args=[task.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(url, {"title": "Renamed", "priority": "medium", "tags": ["home"]}, format="json")
+            # nothing changes
+            self.client.put(url, {"title": "Renamed"}, format="json")
+
+        self.assertEqual(self.history(task), [
+            ("update", {"title": ["Task 0", "Renamed"], "tags": [["urgent", "work"], ["home"]]}),
+        ])
+
+    def test_empty_tags_clear_the_links(self):
+        task = self.create_tasks(1)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(reverse("task-detail", args=[task.pk]), {"tags": []}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["tags"], [])
+        self.assertFalse(task.tags.exists())
+        self.assertEqual(self.history(task), [("update", {"tags": [["urgent", "work"], []]})])
+
+    def test_bulk_writes_insert_history_once(self):
+        tasks = self.create_tasks(5)
+        payload = [{"id": str(task.pk), "status": "done"} for task in tasks]
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse("task-bulk"), payload, format="json")
+        inserts = [q for q in queries if q["sql"].startswith('INSERT INTO "todo_taskhistory"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(TaskHistory.objects.count(), 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(
+                reverse("task-bulk"), {"task_ids": [str(tasks[0].pk)], "status": "pending"}, format="json"
+            )
+        self.assertEqual(self.history(tasks[0]), [
+            ("update", {"status": ["done", "pending"]}),
+            ("update", {"status": ["pending", "done"]}),
+        ])
+
+    def test_history_outlives_deleted_tasks(self):
+        task = self.create_tasks(1)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse("task-detail", args=[task.pk]))
+        self.assertEqual(self.history(task), [("delete", {})])
+
+        response = self.client.get(reverse("task-history", args=[uuid.uuid4()]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_rolled_back_writes_leave_no_history(self):
+        tasks = self.create_tasks(1)
+        payload = [{"id": str(tasks[0].pk), "status": "done"}, {"id": str(uuid.uuid4())}]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(reverse("task-bulk"), payload, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(TaskHistory.objects.exists())
+
+
+class ArchiveTests(TaskAPITestCase):
+    def make_done(self, tasks, days_ago):
+        Task.objects.filter(pk__in=[task.pk for task in tasks]).update(
+            status="done", updated_at=timezone.now() - timedelta(days=days_ago)
+        )
+
+    def test_archive_done_tasks(self):
+        old, older, recent, pending = self.create_tasks(4)
+        self.make_done([old, older], days_ago=100)
+        self.make_done([recent], days_ago=1)
+        Task.objects.filter(pk=pending.pk).update(updated_at=timezone.now() - timedelta(days=100))
+        start = timezone.now() - timedelta(days=101)
+        timetracking.start_tracking(old, now=start)
+        timetracking.stop_tracking(old, now=start + timedelta(hours=1))
+        self.make_done([old], days_ago=100)
+
+        self.assertEqual(archive.archive_done_tasks(batch_size=1), 2)
+
+        self.assertCountEqual(Task.objects.values_list("pk", flat=True), [recent.pk, pending.pk])
+        self.assertCountEqual(TaskTombstone.objects.values_list("pk", flat=True), [old.pk, older.pk])
+        archived = ArchivedTask.objects.get(pk=old.pk)
+        self.assertEqual(archived.title, old.title)
+        self.assertEqual(archived.created_at, old.created_at)
+        self.assertCountEqual(archived.tags, ["work", "urgent"])
+        self.assertEqual(len(archived.time_entries), 1)
+
+        response = self.client.get(reverse("archived-tasks"))
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual([task["id"] for task in response.data["results"]], [str(old.pk), str(older.pk)])
+
+    def test_restore(self):
+        task = self.create_tasks(1)[0]
+        start = timezone.now() - timedelta(days=101)
+        timetracking.start_tracking(task, now=start)
+        timetracking.stop_tracking(task, now=start + timedelta(hours=1))
+        self.make_done([task], days_ago=100)
+        archive.archive_done_tasks()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("archived-task-restore", args=[task.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["id"], str(task.pk))
+        self.assertCountEqual(response.data["tags"], ["work", "urgent"])
+
+        restored = Task.objects.get(pk=task.pk)
+        self.assertEqual(restored.created_at, task.created_at)
+        self.assertEqual(restored.time_spent, timedelta(hours=1))
+        self.assertEqual(restored.time_entries.get().started_at, start)
+        self.assertFalse(ArchivedTask.objects.exists())
+        self.assertFalse(TaskTombstone.objects.exists())
+        self.assertEqual(self.client.get(reverse("task-detail", args=[task.pk])).status_code, 200)
+
+        response = self.client.post(reverse("archived-task-restore", args=[task.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_recurring_tasks_are_archived_oldest_first(self):
+        first = self.create_tasks(1)[0]
+        Task.objects.filter(pk=first.pk).update(recurrence="daily", due_date=timezone.now() - timedelta(days=101))
+        generate_recurring_tasks.delay()
+        second = Task.objects.get(previous_occurrence=first)
+        self.make_done([first, second], days_ago=100)
+
+        # the second one is due for a next occurrence, so it stays
+        self.assertEqual(archive.archive_done_tasks(), 1)
+        self.assertTrue(ArchivedTask.objects.filter(pk=first.pk).exists())
+
+        archive.restore_task(ArchivedTask.objects.get(pk=first.pk))
+        second.refresh_from_db()
+        self.assertEqual(second.previous_occurrence_id, first.pk)
+
+    def test_other_users_tasks_cannot_be_restored(self):
+        other = User.objects.create_user(username="other", email="other@example.com", password="x")
+        task = Task.objects.create(user=other, title="Not mine")
+        self.make_done([task], days_ago=100)
+        archive.archive_done_tasks()
+
+        self.assertEqual(self.client.get(reverse("archived-tasks")).data["results"], [])
+        response = self.client.post(reverse("archived-task-restore", args=[task.pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+class AsyncTaskViewTests(TaskAPITestCase):
+    """
+    The async (ASGI) read-only endpoints match their DRF counterparts.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.auth = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+    async def test_list_detail_and_analytics(self):
+        tasks = await sync_to_async(self.create_tasks)(3)
+
+        response = await self.async_client.get(
+            reverse("async-tasks"), {"page_size": 2}, headers=self.auth
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        expected = await sync_to_async(self.client.get)(reverse("tasks"), {"page_size": 2})
+        self.assertEqual(response.json()["results"], json.loads(expected.content)["results"])
+        self.assertIsNotNone(response.json()["next"])
+
+        response = await self.async_client.get(
+            reverse("async-task-detail", args=[tasks[0].pk]), headers=self.auth
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual(response.json()["tags"], ["work", "urgent"])
+        response = await self.async_client.get(
+            reverse("async-task-detail", args=[tasks[0].pk]),
+            headers={**self.auth, "If-None-Match": response["ETag"]},
+        )
+        self.assertEqual(response.status_code, 304)
+
+        response = await self.async_client.get(reverse("async-task-analytics"), headers=self.auth)
+        self.assertEqual(response.json()["total_tasks"], 3)
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get(reverse("async-tasks"))
+        self.assertEqual(response.status_code, 401)
+
+    def test_session_authentication(self):
+        # authentication classes get a DRF Request, not the Django request
+        rest_framework = {
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_AUTHENTICATION_CLASSES": ("rest_framework.authentication.SessionAuthentication",),
+        }
+        client = Client()
+        client.force_login(self.user)
+        with self.settings(REST_FRAMEWORK=rest_framework):
+            response = client.get(reverse("async-task-analytics"))
+        self.assertEqual(response.status_code, 200)
+
+
+class BenchmarkTests(TestCase):
+    def test_seed_and_cleanup(self):
+        users, tag_names = benchmark.seed(users=2, tasks=30, tags=5)
+        self.assertEqual(Task.objects.filter(user__in=users).count(), 60)
+        self.assertEqual(Task.tags.through.objects.filter(task__user__in=users).count(), 120)
+
+        context = benchmark.scenario_context(users[0], tag_names)
+        self.assertEqual(len(context["task_ids"]), 30)
+
+        benchmark.cleanup(users, tag_names)
+        self.assertFalse(User.objects.filter(pk__in=[user.pk for user in users]).exists())
+        self.assertFalse(Tag.objects.filter(name__in=tag_names).exists())
+
+    def test_compare(self):
+        baseline = {"list": {"p50_ms": 10.0, "queries": 2, "errors": 0}}
+        self.assertEqual(
+            benchmark.compare({"list": {"p50_ms": 12.0, "queries": 2, "errors": 0}}, baseline, 0.25), []
+        )
+        regressions = benchmark.compare(
+            {"list": {"p50_ms": 13.0, "queries": 3, "errors": 1}}, baseline, 0.25
+        )
+        self.assertEqual(len(regressions), 3)
@@ -0,0 +1,88 @@
+"""
+Time tracking of tasks.
+
+Each session of work on a task is a TimeEntry: start_tracking() appends
+one, stop_tracking() closes it and adds its duration to the task's
+time_spent with an F() expression, so concurrent stops cannot lose time.
+A task has at most one running entry, which a partial unique constraint
+enforces even under concurrent starts.
+
+The task's start_time and end_time are kept as the times of day its last
+session started and ended.
+"""
+
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import invalidate_user_tasks
+from .models import Task, TimeEntry
+
+
+def start_tracking(task, now=None):
+    """
+    Start a session on the task. Returns the new entry, or None if one is
+    already running.
+    """
+    now = now or timezone.now()
+    try:
+        with transaction.atomic():
+            entry = TimeEntry.objects.create(task=task, started_at=now)
+            Task.objects.filter(pk=task.pk).update(
+                start_time=now.time(), end_time=None, updated_at=now
+            )
+    except IntegrityError:
+        return None
+    invalidate_user_tasks(task.user_id)
+    return entry
+
+
+def stop_tracking(task, now=None):
+    """
+    Close the task's running session. Returns the closed entry, or None if
+    none is running.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        entry = TimeEntry.objects.select_for_update().running().filter(task=task).first()
+        if entry is None:
+            return None
+        entry.ended_at = max(now, entry.started_at)
+        entry.duration = entry.ended_at - entry.started_at
+        entry.save(update_fields=["ended_at", "duration"])
+        Task.objects.filter(pk=task.pk).update(
+            time_spent=Coalesce(F("time_spent"), timedelta(0)) + entry.duration,
+            end_time=entry.ended_at.time(),
+            updated_at=now,
+        )
+        invalidate_user_tasks(task.user_id)
+    return entry
+
+
+def time_report(user, since=None, until=None):
+    """
+    Time the user spent per task on sessions started in [since, until),
+    most first, with the total.
+    """
+    entries = TimeEntry.objects.filter(task__user=user)
+    if since is not None:
+        entries = entries.filter(started_at__gte=since)
+    if until is not None:
+        entries = entries.filter(started_at__lt=until)
+
+    tasks = [
+        {
+            "task": row["task_id"],
+            "title": row["task__title"],
+            "time_spent": row["time_spent"],
+            "sessions": row["sessions"],
+        }
+        for row in entries.report()
+    ]
+    return {
+        "total_time_spent": sum((row["time_spent"] for row in tasks), timedelta(0)),
+        "tasks": tasks,
+    }
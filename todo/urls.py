@@ -1,7 +1,33 @@
 from django.urls import path
-from .views import TaskListCreateView, TaskDetailView
+from .views import (
+    ArchivedTaskListView,
+    ArchivedTaskRestoreView,
+    TaskListCreateView,
+    TaskDetailView,
+    TaskAnalyticsView,
+    BulkTaskUpdateView,
+    TaskChangesView,
+    TaskExportView,
+    TaskHistoryView,
+    TaskImportView,
+    TaskSearchView,
+    TaskTrackingView,
+    TimeReportView,
+)
 
 urlpatterns = [
     path("", TaskListCreateView.as_view(), name="tasks"),
     path("<uuid:pk>/", TaskDetailView.as_view(), name="task-detail"),
+    path("analytics/", TaskAnalyticsView.as_view(), name="task-analytics"),
+    path("bulk/", BulkTaskUpdateView.as_view(), name="task-bulk"),
+    path("changes/", TaskChangesView.as_view(), name="task-changes"),
+    path("export/", TaskExportView.as_view(), name="task-export"),
+    path("import/", TaskImportView.as_view(), name="task-import"),
+    path("search/", TaskSearchView.as_view(), name="task-search"),
+    path("<uuid:pk>/start/", TaskTrackingView.as_view(operation="start"), name="task-start"),
+    path("<uuid:pk>/stop/", TaskTrackingView.as_view(operation="stop"), name="task-stop"),
+    path("<uuid:pk>/history/", TaskHistoryView.as_view(), name="task-history"),
+    path("archived/", ArchivedTaskListView.as_view(), name="archived-tasks"),
+    path("archived/<uuid:pk>/restore/", ArchivedTaskRestoreView.as_view(), name="archived-task-restore"),
+    path("time-report/", TimeReportView.as_view(), name="time-report"),
 ]
@@ -1,13 +1,44 @@
 
+import csv
+import uuid
+
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.utils import timezone
 from rest_framework.permissions import IsAuthenticated
 
+from . import archive, fastpath, history, importers, renderers, timetracking
+from .filters import TaskFilter
+from .instrumentation import timed
 from .permissions import IsOwner
-from .models import Task
-from .serializers import TaskSerializer
+from .models import ArchivedTask, Task, TaskHistory
+from .pagination import ArchivedTaskPagination, TaskCursorPagination, TaskHistoryPagination, TaskSearchPagination
+from .routers import replica_reads
+from .search import search_tasks
+from .cache import (
+    get_analytics,
+    get_cached_page,
+    get_task_version,
+    invalidate_user_tasks,
+    page_cache_key,
+    set_analytics,
+    set_cached_page,
+)
+from .etags import conditional_response, task_etag, task_list_etag
+from .serializers import (
+    ArchivedTaskSerializer,
+    TaskHistorySerializer,
+    TaskSerializer,
+    TimeEntrySerializer,
+    TimeReportParamsSerializer,
+    TimeReportSerializer,
+)
+from .sync import SyncTokenExpired, changes_since, decode_sync_token, encode_sync_token, is_expired
 
 
 class TaskListCreateView(APIView):
@@ -15,36 +46,64 @@ class TaskListCreateView(APIView):
     API view to create and list tasks for authenticated users.
     
     Methods:
-        get: List tasks based on filters.
+        get: List tasks based on filters (see TaskFilter).
         post: Create a new task.
+
+    With TASK_FAST_SERIALIZATION, listed tasks are rendered from .values()
+    rows by todo.fastpath instead of TaskSerializer; the output is the same.
     """
   
     permission_classes = [IsAuthenticated, IsOwner]
+    pagination_class = TaskCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = TaskFilter
 
+    @replica_reads
     def get(self, request):
 
         """
         Handle GET request to fetch tasks for the authenticated user.
-        apply filters if provided for status, priority,.
+        apply filters if provided for tags, status, priority, due date and ordering.
+        Results are cursor paginated, newest first.
+        Returns 304 Not Modified, after a single aggregate query, if the client's ETag is current.
+        Pages are cached per user until one of their tasks changes.
         """
-        tasks = Task.objects.filter(user=request.user)
-
-        if not tasks:
-            return Response({"detail":"All clean. You have no tasks today."}, status=status.HTTP_200_OK)
+        etag = task_list_etag(request)
+        not_modified = conditional_response(request, etag)
+        if not_modified is not None:
+            return not_modified
 
-        # Apply filters
-        status_filter = request.query_params.get('status')
-        priority_filter = request.query_params.get('priority')
-        
+        version = get_task_version(request.user.pk)
+        cache_key = page_cache_key(request.user.pk, version, "list", request.get_full_path())
+        data = get_cached_page(cache_key)
+        if data is not None:
+            return Response(data, status=status.HTTP_200_OK, headers={"ETag": etag})
 
-        if status_filter:
-            tasks = tasks.filter(status=status_filter)
-        if priority_filter:
-            tasks = tasks.filter(priority=priority_filter)
+        tasks = Task.objects.filter(user=request.user)
 
+        if not tasks.exists():
+            data = {"detail":"All clean. You have no tasks today."}
+            set_cached_page(cache_key, data)
+            return Response(data, status=status.HTTP_200_OK, headers={"ETag": etag})
 
-        serializer = TaskSerializer(tasks, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Apply filters
+        for backend in self.filter_backends:
+            tasks = backend().filter_queryset(request, tasks, self)
+
+        paginator = self.pagination_class()
+        if fastpath.enabled():
+            page = paginator.paginate_queryset(fastpath.task_rows(tasks), request, view=self)
+            with timed("serialize"):
+                data = fastpath.render_tasks(page)
+        else:
+            page = paginator.paginate_queryset(tasks.with_related(), request, view=self)
+            with timed("serialize"):
+                data = TaskSerializer(page, many=True).data
+
+        response = paginator.get_paginated_response(data)
+        set_cached_page(cache_key, response.data)
+        response["ETag"] = etag
+        return response
 
     def post(self, request):
         """
@@ -67,35 +126,61 @@ class TaskDetailView(APIView):
         get: Retrieve a specific task.
         put: Update task details.
         delete: Delete a task.
+
+    Responses carry an ETag: GET honours If-None-Match and PUT honours
+    If-Match, for optimistic concurrency.
     """
     permission_classes = [IsAuthenticated, IsOwner]
 
     def get_object(self, pk, user):
         try:
-            return Task.objects.get(pk=pk, user=user)
+            return Task.objects.select_related("user").get(pk=pk, user=user)
         except Task.DoesNotExist:
             return None
 
     def get(self, request, pk):
         """
         Handle GET request to retrieve a task.
+        The task is cached per user until one of their tasks changes.
         """
-        task = self.get_object(pk, request.user)
-        if task is None:
-            return Response(status=status.HTTP_404_NOT_FOUND)
-
-        serializer = TaskSerializer(task)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        version = get_task_version(request.user.pk)
+        cache_key = page_cache_key(request.user.pk, version, "detail", pk)
+        cached = get_cached_page(cache_key)
+
+        if cached is not None:
+            etag, data = cached
+        else:
+            task = self.get_object(pk, request.user)
+            if task is None:
+                return Response(status=status.HTTP_404_NOT_FOUND)
+            etag, data = task_etag(task), None
+
+        not_modified = conditional_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        if data is None:
+            prefetch_related_objects([task], "tags")
+            with timed("serialize"):
+                data = TaskSerializer(task).data
+            set_cached_page(cache_key, (etag, data))
+
+        return Response(data, status=status.HTTP_200_OK, headers={"ETag": etag})
 
     def put(self, request, pk):
         """
         Handle PUT request to update a task.
         Ensure that tasks with a passed due date cannot be updated.
+        With If-Match, the update only goes ahead if the task is unchanged.
         """
         task = self.get_object(pk, request.user)
         if task is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
+        precondition_failed = conditional_response(request, task_etag(task))
+        if precondition_failed is not None:
+            return precondition_failed
+
         # Ensure that tasks with a passed due date cannot be updated
         if task.is_overdue():
             return Response(
@@ -107,7 +192,7 @@ class TaskDetailView(APIView):
 
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return Response(serializer.data, status=status.HTTP_200_OK, headers={"ETag": task_etag(task)})
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request, pk):
@@ -118,10 +203,303 @@ class TaskDetailView(APIView):
         if task is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
-        task.delete()
+        with transaction.atomic():
+            history.record(request.user.pk, {task.pk: {}}, action="delete")
+            task.delete()
         return Response({"detail":"Task deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
 
 
+class TaskHistoryView(APIView):
+    """
+    API view to list the changes made to a task (see todo.history).
+
+    Methods:
+        get: List the task's updates and deletion, newest first.
+    """
+    permission_classes = [IsAuthenticated, IsOwner]
+    pagination_class = TaskHistoryPagination
+
+    def get(self, request, pk):
+        """
+        Handle GET request to list a task's history, cursor paginated.
+        The history of a deleted task stays available.
+        """
+        records = TaskHistory.objects.filter(task_id=pk, user=request.user).order_by("-changed_at")
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(records, request, view=self)
+
+        if not page and not paginator.cursor and not Task.objects.filter(pk=pk, user=request.user).exists():
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        return paginator.get_paginated_response(TaskHistorySerializer(page, many=True).data)
+
+
+class ArchivedTaskListView(APIView):
+    """
+    API view to list the archived tasks of authenticated users (see
+    todo.archive).
+
+    Methods:
+        get: List archived tasks, most recently archived first.
+    """
+    permission_classes = [IsAuthenticated, IsOwner]
+    pagination_class = ArchivedTaskPagination
+
+    def get(self, request):
+        """
+        Handle GET request to list archived tasks, cursor paginated.
+        """
+        tasks = ArchivedTask.objects.filter(user=request.user).select_related("user").defer("time_entries")
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(tasks, request, view=self)
+        return paginator.get_paginated_response(ArchivedTaskSerializer(page, many=True).data)
+
+
+class ArchivedTaskRestoreView(APIView):
+    """
+    API view to move an archived task back to the user's tasks.
+
+    Methods:
+        post: Restore the task.
+    """
+    permission_classes = [IsAuthenticated, IsOwner]
+
+    def post(self, request, pk):
+        """
+        Handle POST request to restore an archived task, with its id,
+        tags and time entries.
+        """
+        archived = ArchivedTask.objects.filter(pk=pk, user=request.user).first()
+        if archived is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        task = archive.restore_task(archived)
+        task = Task.objects.with_related().get(pk=task.pk)
+        return Response(TaskSerializer(task).data, status=status.HTTP_200_OK)
+
+
+class TaskSearchView(APIView):
+    """
+    API view to search the user's tasks by title and description.
+
+    Matching uses a full-text index (see todo.search) and results are
+    ranked best match first, titles weighing more than descriptions.
+
+    Methods:
+        get: Search tasks.
+    """
+    permission_classes = [IsAuthenticated, IsOwner]
+    pagination_class = TaskSearchPagination
+
+    def get(self, request):
+        """
+        Handle GET request to search tasks with `?q=`.
+        Results are paginated with `?page=` and cached per user until one
+        of their tasks changes.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {"error": "q is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        version = get_task_version(request.user.pk)
+        cache_key = page_cache_key(request.user.pk, version, "search", request.get_full_path())
+        data = get_cached_page(cache_key)
+        if data is not None:
+            return Response(data, status=status.HTTP_200_OK)
+
+        paginator = self.pagination_class()
+        ids = paginator.paginate_queryset(search_tasks(request.user, query), request, view=self)
+
+        tasks = Task.objects.filter(user=request.user, pk__in=ids)
+        if fastpath.enabled():
+            rows = {row["id"]: row for row in fastpath.task_rows(tasks)}
+            with timed("serialize"):
+                data = fastpath.render_tasks(rows[pk] for pk in ids if pk in rows)
+        else:
+            tasks = tasks.with_related().in_bulk()
+            with timed("serialize"):
+                data = TaskSerializer([tasks[pk] for pk in ids if pk in tasks], many=True).data
+
+        response = paginator.get_paginated_response(data)
+        set_cached_page(cache_key, response.data)
+        return response
+
+
+class TaskChangesView(APIView):
+    """
+    API view for incremental sync: the tasks created, updated or deleted
+    since a sync token.
+
+    Methods:
+        get: Retrieve a page of changes.
+    """
+    permission_classes = [IsAuthenticated, IsOwner]
+    page_size = 100
+    max_page_size = 500
+
+    def get(self, request):
+        """
+        Handle GET request to list changes after `since`, oldest first.
+        Without `since`, every task is returned (an initial sync).
+        Keep calling with the returned `next_token` while `has_more` is true,
+        then store it for the next sync.
+        """
+        since = request.query_params.get('since')
+        position = None
+
+        if since:
+            try:
+                position = decode_sync_token(since)
+                expired = is_expired(request.user, position)
+            except SyncTokenExpired:
+                expired = True
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if expired:
+                return Response(
+                    {"error": "Sync token expired. Download all tasks again."},
+                    status=status.HTTP_410_GONE
+                )
+
+        try:
+            page_size = min(int(request.query_params.get('page_size', self.page_size)), self.max_page_size)
+        except ValueError:
+            page_size = self.page_size
+        if page_size <= 0:
+            page_size = self.page_size
+
+        updated, deleted, next_position, has_more = changes_since(
+            request.user, position, limit=page_size
+        )
+
+        return Response({
+            "updated": TaskSerializer(updated, many=True).data,
+            "deleted": deleted,
+            "next_token": encode_sync_token(*next_position) if next_position else None,
+            "has_more": has_more,
+        }, status=status.HTTP_200_OK)
+
+
+class TaskExportView(APIView):
+    """
+    API view to export all of the user's tasks.
+
+    The response is streamed: tasks are read with a server-side iterator
+    and serialized a chunk at a time (with tags prefetched per chunk), so
+    memory use stays flat however many tasks the user has.
+    With TASK_FAST_SERIALIZATION, tasks are rendered by todo.fastpath.
+
+    Methods:
+        get: Download the tasks as NDJSON (default) or as a JSON array.
+    """
+    permission_classes = [IsAuthenticated, IsOwner]
+    chunk_size = 500
+    content_types = {
+        'ndjson': 'application/x-ndjson',
+        'json': 'application/json',
+    }
+
+    def get(self, request):
+        """
+        Handle GET request to export tasks, oldest first.
+        Choose the format with `?output=ndjson` or `?output=json`.
+        """
+        output = request.query_params.get('output', 'ndjson')
+        if output not in self.content_types:
+            return Response(
+                {"error": "output must be one of: ndjson, json."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        tasks = Task.objects.filter(user=request.user).order_by('created_at', 'id')
+        if fastpath.enabled():
+            tasks = fastpath.task_rows(tasks)
+        else:
+            tasks = tasks.with_related()
+        chunks = self.serialize_chunks(tasks)
+        body = self.stream_ndjson(chunks) if output == 'ndjson' else self.stream_json(chunks)
+
+        response = StreamingHttpResponse(body, content_type=self.content_types[output])
+        response['Content-Disposition'] = f'attachment; filename="tasks.{output}"'
+        return response
+
+    def serialize_chunks(self, tasks):
+        """
+        Yield lists of encoded tasks, one list per database chunk.
+        """
+        chunk = []
+        for task in tasks.iterator(chunk_size=self.chunk_size):
+            chunk.append(task)
+            if len(chunk) == self.chunk_size:
+                yield self.encode(chunk)
+                chunk = []
+        if chunk:
+            yield self.encode(chunk)
+
+    def encode(self, tasks):
+        if fastpath.enabled():
+            data = fastpath.render_tasks(tasks)
+        else:
+            data = TaskSerializer(tasks, many=True).data
+        return [renderers.dumps(item) for item in data]
+
+    def stream_ndjson(self, chunks):
+        for chunk in chunks:
+            yield b''.join(item + b'\n' for item in chunk)
+
+    def stream_json(self, chunks):
+        yield b'['
+        separator = b''
+        for chunk in chunks:
+            yield separator + b','.join(chunk)
+            separator = b','
+        yield b']'
+
+
+class TaskImportView(APIView):
+    """
+    API view to import tasks from an uploaded CSV or NDJSON file.
+
+    The file is read and written in batches (see todo.importers), so rows
+    with errors are reported without aborting the rest of the import.
+
+    Methods:
+        post: Import the tasks in the `file` upload.
+    """
+    permission_classes = [IsAuthenticated, IsOwner]
+    batch_size = 500
+
+    def post(self, request):
+        """
+        Handle POST request to import tasks.
+        The format is taken from `?input=csv|ndjson`, or else from the file extension.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "No file uploaded."}, status=status.HTTP_400_BAD_REQUEST)
+
+        input_format = request.query_params.get('input') or upload.name.rpartition('.')[2].lower()
+        if input_format not in importers.FORMATS:
+            return Response(
+                {"error": "input must be one of: csv, ndjson."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        importer = importers.TaskImporter(request.user, batch_size=self.batch_size)
+        try:
+            importer.run(importers.text_stream(upload.file), input_format)
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response(
+                {**importer.result, "error": f"Could not read file: {e}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(importer.result, status=status.HTTP_200_OK)
+
+
 class TaskAnalyticsView(APIView):
     """
     API view to provide task analytics for authenticated users.
@@ -131,50 +509,182 @@ class TaskAnalyticsView(APIView):
     """
     permission_classes = [IsAuthenticated, IsOwner]
 
+    @replica_reads
     def get(self, request):
         """
-        Handle GET request to provide analytics on completed, pending, and overdue tasks.
+        Handle GET request to provide analytics on completed, pending, in progress
+        and overdue tasks, broken down by priority and tag.
+        With TASK_ANALYTICS_CACHE, results are cached per user until one of
+        their tasks changes.
         """
         user = request.user
-        completed_tasks = Task.objects.filter(user=user, status='done').count()
-        pending_tasks = Task.objects.filter(user=user, status='pending').count()
-        overdue_tasks = Task.objects.filter(user=user, due_date__lt=timezone.now()).count()
-
-        data = {
-            'completed_tasks': completed_tasks,
-            'pending_tasks': pending_tasks,
-            'overdue_tasks': overdue_tasks,
-        }
+        data = get_analytics(user.pk)
+
+        if data is None:
+            data = Task.objects.filter(user=user).analytics()
+            set_analytics(user.pk, data)
+
         return Response(data)
 
+class TaskTrackingView(APIView):
+    """
+    API view to track the time spent on a task (see todo.timetracking).
+
+    Routed twice, with `operation` set to "start" or "stop".
+
+    Methods:
+        post: Start or stop a session of work on the task.
+    """
+    permission_classes = [IsAuthenticated, IsOwner]
+    operation = None
+
+    def post(self, request, pk):
+        """
+        Handle POST request to start (201) or stop (200) a session.
+        A task has at most one running session.
+        """
+        task = Task.objects.filter(pk=pk, user=request.user).only("id", "user_id").first()
+        if task is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        if self.operation == "start":
+            entry = timetracking.start_tracking(task)
+            if entry is None:
+                return Response(
+                    {"error": "Time tracking has already started for this task."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response(TimeEntrySerializer(entry).data, status=status.HTTP_201_CREATED)
+
+        entry = timetracking.stop_tracking(task)
+        if entry is None:
+            return Response(
+                {"error": "Time tracking has not started for this task."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(TimeEntrySerializer(entry).data, status=status.HTTP_200_OK)
+
+
+class TimeReportView(APIView):
+    """
+    API view to report the time spent per task by authenticated users.
+
+    Methods:
+        get: Retrieve the time spent on each task, most first.
+    """
+    permission_classes = [IsAuthenticated, IsOwner]
+
+    def get(self, request):
+        """
+        Handle GET request to report the time spent on sessions started
+        between the optional `since` and `until` timestamps.
+        """
+        params = TimeReportParamsSerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        report = timetracking.time_report(request.user, **params.validated_data)
+        return Response(TimeReportSerializer(report).data, status=status.HTTP_200_OK)
+
+
 class BulkTaskUpdateView(APIView):
     """
-    API view to update multiple tasks' status in bulk.
-    
+    API view to create, update and delete tasks in bulk.
+
+    Every item is validated through TaskSerializer and the whole batch is
+    written in one transaction: either every item succeeds or nothing is
+    written and the per-item errors are returned.
+
     Methods:
+        post: Create a list of tasks.
+        patch: Partially update a list of tasks, each identified by its `id`.
         put: Update status for multiple tasks.
+        delete: Delete a list of tasks.
     """
     permission_classes = [IsAuthenticated, IsOwner]
+    max_batch_size = 1000
+
+    def post(self, request):
+        """
+        Handle POST request to create a list of tasks.
+        """
+        serializer = TaskSerializer(
+            data=request.data, many=True, allow_empty=False, max_length=self.max_batch_size
+        )
+
+        if serializer.is_valid():
+            serializer.save(user=request.user)
+            invalidate_user_tasks(request.user.pk)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def patch(self, request):
+        """
+        Handle PATCH request to update a list of tasks.
+        Only the fields present in each item are changed.
+        """
+        serializer = TaskSerializer(
+            Task.objects.filter(user=request.user),
+            data=request.data,
+            many=True,
+            partial=True,
+            allow_empty=False,
+            max_length=self.max_batch_size,
+        )
+
+        if serializer.is_valid():
+            serializer.save()
+            invalidate_user_tasks(request.user.pk)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def put(self, request):
         task_ids = request.data.get('task_ids')
         new_status = request.data.get('status')
 
-        if task_ids and new_status:
-            tasks = Task.objects.filter(id__in=task_ids, user=request.user)
-            tasks.update(status=new_status)
+        if task_ids and new_status in dict(Task.STATUS_CHOICES):
+            tasks = Task.objects.filter(id__in=task_ids, user=request.user).exclude(status=new_status)
+            with transaction.atomic():
+                changes = {
+                    pk: {"status": [old_status, new_status]}
+                    for pk, old_status in tasks.select_for_update().values_list("id", "status")
+                }
+                Task.objects.filter(id__in=changes).update(status=new_status, updated_at=timezone.now())
+                history.record(request.user.pk, changes)
+            # queryset.update() sends no signals
+            invalidate_user_tasks(request.user.pk)
             return Response({"message": "Tasks updated successfully."}, status=status.HTTP_200_OK)
         return Response({"error": "Invalid input."}, status=status.HTTP_400_BAD_REQUEST)
-    
 
-# Task History
-# time tracking
-# task analytics and insights
-# endpoints for tags : crud
-# endpoints for starting and ending a task
-# endpoint for viewing archived tasks
-
-# Business Logic:
-# After marking a task as "done" or when the due date passes, check if the task is recurring.
-# If the task is recurring, create a new task instance with a new due_date based on the recurrence frequency.
-# Example: If the recurrence is daily, increment the due_date by 1 day and save it as a new task.
+    def delete(self, request):
+        """
+        Handle DELETE request to delete a list of tasks, given their `task_ids`.
+        Reports which ids were deleted and which were not found.
+        """
+        task_ids = request.data.get('task_ids') if isinstance(request.data, dict) else None
+
+        if not isinstance(task_ids, list) or not 0 < len(task_ids) <= self.max_batch_size:
+            return Response({"error": "Invalid input."}, status=status.HTTP_400_BAD_REQUEST)
+
+        ids = [_as_uuid(task_id) for task_id in task_ids]
+
+        with transaction.atomic():
+            tasks = Task.objects.filter(id__in=[pk for pk in ids if pk], user=request.user)
+            deleted = set(tasks.values_list('id', flat=True))
+            tasks.delete()
+            history.record(request.user.pk, dict.fromkeys(deleted, {}), action="delete")
+
+        return Response({
+            "deleted": [task_id for task_id, pk in zip(task_ids, ids) if pk in deleted],
+            "not_found": [task_id for task_id, pk in zip(task_ids, ids) if pk not in deleted],
+        }, status=status.HTTP_200_OK)
+
+
+def _as_uuid(value):
+    """
+    Parse a task id from a request payload, returning None if it is invalid.
+    """
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
@@ -0,0 +1,16 @@
+"""
+Celery application for the todoAPI project.
+
+Tasks are discovered from the installed apps' tasks.py modules and
+configured from the CELERY_* Django settings.
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "todoAPI.settings")
+
+app = Celery("todoAPI")
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
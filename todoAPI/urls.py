@@ -3,6 +3,8 @@ from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
 
+from todo.instrumentation import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
 
@@ -19,4 +21,10 @@ urlpatterns = [
 
     # Task Management
     path("api/tasks/", include('todo.urls')),
+
+    # Async (ASGI) read-only task endpoints
+    path("api/async/tasks/", include('todo.async_urls')),
+
+    # Prometheus metrics of the task endpoints
+    path("metrics", metrics_view, name="metrics"),
 ]